@@ -1,13 +1,20 @@
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
-from httpx import AsyncClient
-from typing import List, Optional, Dict, Any, Union
+from httpx import AsyncClient, Limits, URL
+from contextlib import asynccontextmanager
+from typing import List, Optional, Dict, Any, Union, Tuple, Mapping
+from types import MappingProxyType
 import os
+import sys
 import json
+import orjson
 import uuid
 import datetime
+from collections import OrderedDict
 import asyncio
+import time
 import aiofiles
 from dotenv import load_dotenv
 import traceback
@@ -15,11 +22,41 @@ import traceback
 load_dotenv()
 
 MCP_SERVER_URLS = os.getenv("MCP_SERVER_URLS").split(",")
+# (server_url, pre-parsed /list/tools URL) for each configured MCP server
+LIST_TOOLS_URLS = tuple((url.strip(), URL(f"{url.strip()}/list/tools"))
+                        for url in MCP_SERVER_URLS if url.strip())
 LOGS_DIR = os.getenv("LOGS_DIR", "logs")
+TOOLS_CACHE_TTL = float(os.getenv("TOOLS_CACHE_TTL", 60))
+EXECUTE_BATCH_SIZE = int(os.getenv("EXECUTE_BATCH_SIZE", 16))
+EXECUTE_BATCH_DELAY = float(os.getenv("EXECUTE_BATCH_DELAY", 0.01))
+# Quick, read-only tools that may share a batch. Anything else (run_command,
+# writes, git) is posted on its own so it never holds up or fails other calls.
+BATCHABLE_TOOLS = frozenset({"read_file", "show_folder_tree"})
+MCP_DEBUG = bool(os.getenv("MCP_DEBUG"))
+# Tool results up to this size are logged in full; larger ones by size only
+LOG_RESULT_MAX_BYTES = int(os.getenv("LOG_RESULT_MAX_BYTES", 0))
 
 os.makedirs(LOGS_DIR, exist_ok=True)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.http = AsyncClient(limits=Limits(max_keepalive_connections=64,
+                                               max_connections=128),
+                                 timeout=10.0)
+    app.state.batchers = {}
+    MCPLogger.start()
+    try:
+        yield
+    finally:
+        for batcher in app.state.batchers.values():
+            batcher.close()
+        await MCPLogger.stop()
+        await app.state.http.aclose()
+
+
+app = FastAPI(lifespan=lifespan,
+              default_response_class=ORJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -50,85 +87,320 @@ class ErrorResponse(BaseModel):
 
 
 class MCPLogger:
-
-    @staticmethod
-    async def log_message(client_id: str, message: Dict[str, Any],
-                          message_type: str):
-        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
-        log_filename = f"{client_id}-{timestamp}.log"
+    """Queue-backed logger; a single background task batches writes to disk"""
+
+    queue: Optional[asyncio.Queue] = None
+    writer_task: Optional[asyncio.Task] = None
+    max_batch_size = 256
+    # Open log files keyed by path, least recently used first
+    open_files: "OrderedDict[str, Any]" = OrderedDict()
+    max_open_files = 128
+
+    @classmethod
+    def log_message(cls, client_id: str, message: Dict[str, Any],
+                    message_type: str):
+        now = datetime.datetime.now()
+        log_filename = f"{client_id}-{now.strftime('%Y%m%d')}.log"
         log_path = os.path.join(LOGS_DIR, log_filename)
 
         log_entry = {
-            "timestamp": timestamp,
+            "timestamp": now.strftime("%Y%m%d-%H%M%S"),
             "client_id": client_id,
             "type": message_type,
             "content": message
         }
 
-        async with aiofiles.open(log_path, "a") as f:
-            await f.write(json.dumps(log_entry, indent=4) + "\n")
+        cls.queue.put_nowait((log_path, log_entry))
+
+    @classmethod
+    async def _get_file(cls, log_path: str):
+        f = cls.open_files.get(log_path)
+        if f is not None:
+            cls.open_files.move_to_end(log_path)
+            return f
 
+        if len(cls.open_files) >= cls.max_open_files:
+            _, oldest = cls.open_files.popitem(last=False)
+            await oldest.close()
+        f = await aiofiles.open(log_path, "ab")
+        cls.open_files[log_path] = f
+        return f
 
-async def fetch_tools_from_servers() -> List[Dict[str, Any]]:
+    @staticmethod
+    def _encode_entry(log_entry: Dict[str, Any]) -> bytes:
+        try:
+            return orjson.dumps(log_entry, option=orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            # e.g. integers beyond 64 bits in tool inputs; one bad entry
+            # must not cost the rest of the batch
+            return (json.dumps(log_entry, default=str) + "\n").encode()
+
+    @classmethod
+    async def _write_batch(cls, batch):
+        lines_by_path = {}
+        for log_path, log_entry in batch:
+            lines_by_path.setdefault(log_path,
+                                     []).append(cls._encode_entry(log_entry))
+
+        for log_path, lines in lines_by_path.items():
+            f = await cls._get_file(log_path)
+            await f.write(b"".join(lines))
+            await f.flush()
+
+    @classmethod
+    async def _close_files(cls):
+        while cls.open_files:
+            _, f = cls.open_files.popitem()
+            await f.close()
+
+    @classmethod
+    async def _drain(cls):
+        running = True
+        while running:
+            batch = []
+            item = await cls.queue.get()
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= cls.max_batch_size or cls.queue.empty():
+                    break
+                item = cls.queue.get_nowait()
+            # None is the shutdown sentinel pushed by stop()
+            running = item is not None
+            if batch:
+                try:
+                    await cls._write_batch(batch)
+                except Exception as e:
+                    print(f"Error writing logs: {str(e)}")
+
+    @classmethod
+    def start(cls):
+        cls.queue = asyncio.Queue()
+        cls.writer_task = asyncio.create_task(cls._drain())
+
+    @classmethod
+    async def stop(cls):
+        cls.queue.put_nowait(None)
+        await cls.writer_task
+        await cls._close_files()
+
+
+def get_http_client() -> AsyncClient:
+    """Shared pooled HTTP client created in the app lifespan"""
+    return app.state.http
+
+
+async def fetch_tools_from_servers(
+    client: AsyncClient
+) -> Tuple[Tuple[Dict[str, Any], ...], Mapping[str, str]]:
     all_tools = []
     server_tools_map = {}
 
-    for server_url in MCP_SERVER_URLS:
-        if not server_url.strip():
-            continue
+    responses = await asyncio.gather(
+        *[client.get(list_url) for _, list_url in LIST_TOOLS_URLS],
+        return_exceptions=True)
 
+    for (server_url, _), response in zip(LIST_TOOLS_URLS, responses):
         try:
-            async with AsyncClient() as client:
-                response = await client.get(f"{server_url}/list/tools")
-                if response.status_code == 200:
-                    tools = response.json()
-                    for tool in tools:
-                        tool_name = tool.get("name")
-                        server_tools_map[tool_name] = server_url
-                        all_tools.append(tool)
+            if isinstance(response, Exception):
+                raise response
+            if response.status_code == 200:
+                tools = response.json()
+                for tool in tools:
+                    tool_name = tool.get("name")
+                    server_tools_map[tool_name] = server_url
+                    all_tools.append(tool)
+        except Exception as e:
+            MCPLogger.log_message(
+                "hub", {
+                    "server_url": server_url,
+                    "error": str(e),
+                    "tb": traceback.format_exc() if MCP_DEBUG else None
+                }, "fetch_tools_error")
+
+    # Read-only views so endpoints cannot mutate the shared cache
+    return tuple(all_tools), MappingProxyType(server_tools_map)
+
+
+class ToolBatcher:
+    """Coalesces concurrent tool calls bound for one MCP server.
+
+    Calls to BATCHABLE_TOOLS submitted within ``max_delay`` seconds of each
+    other are sent as a single request to the server's ``/execute/tool/batch``
+    endpoint. Other tools are posted directly. If the endpoint is missing or
+    the batch request fails as a whole, the calls are retried one by one.
+    """
+
+    def __init__(self,
+                 client: AsyncClient,
+                 server_url: str,
+                 max_batch_size: int = EXECUTE_BATCH_SIZE,
+                 max_delay: float = EXECUTE_BATCH_DELAY):
+        self.client = client
+        self.server_url = server_url
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.batch_supported = True
+        self.execute_url = URL(f"{server_url}/execute/tool")
+        self.execute_batch_url = URL(f"{server_url}/execute/tool/batch")
+        self.queue = asyncio.Queue()
+        self.dispatches = set()
+        self.task = asyncio.create_task(self._run())
+
+    async def submit(self, tool_name: str,
+                     parameters: Union[Dict[str, Any],
+                                       None]) -> Tuple[int, Optional[bytes]]:
+        """Queue a tool call and wait for its (status_code, JSON result bytes)"""
+        if tool_name not in BATCHABLE_TOOLS:
+            return await self._post_single(tool_name, parameters)
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((tool_name, parameters, future))
+        return await future
+
+    def close(self):
+        self.task.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(
+                        self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Dispatch in the background so the next batch can start filling
+            dispatch = asyncio.create_task(self._dispatch(batch))
+            self.dispatches.add(dispatch)
+            dispatch.add_done_callback(self.dispatches.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            results = None
+            if len(batch) > 1 and self.batch_supported:
+                try:
+                    results = await self._post_batch(batch)
+                except Exception as e:
+                    # Batched tools are read-only, so they are safe to resend
+                    print(f"Batch request to {self.server_url} failed, "
+                          f"retrying calls individually: {e}")
+            if results is None:
+                results = await asyncio.gather(
+                    *[self._post_single(tool_name, parameters)
+                      for tool_name, parameters, _ in batch],
+                    return_exceptions=True)
         except Exception as e:
-            print(
-                f"Error fetching tools from {server_url}: {str(e)}\n{traceback.format_exc()}"
-            )
+            results = [e] * len(batch)
+
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _post_single(self, tool_name, parameters):
+        response = await self.client.post(self.execute_url,
+                                          json={
+                                              "tool_name": tool_name,
+                                              "parameters": parameters
+                                          })
+        if response.status_code == 200:
+            # Keep the body encoded; it is embedded as-is in the hub response
+            return response.status_code, response.content
+        return response.status_code, None
+
+    async def _post_batch(self, batch):
+        response = await self.client.post(
+            self.execute_batch_url,
+            json={
+                "calls": [{
+                    "tool_name": tool_name,
+                    "parameters": parameters
+                } for tool_name, parameters, _ in batch]
+            })
+        if response.status_code in (404, 405):
+            self.batch_supported = False
+            return None
+        response.raise_for_status()
+        return [(item["status_code"],
+                 orjson.dumps(item["result"]) if "result" in item else None)
+                for item in orjson.loads(response.content)]
+
+
+def get_batcher(client: AsyncClient, server_url: str) -> ToolBatcher:
+    batchers = app.state.batchers
+    if server_url not in batchers:
+        batchers[server_url] = ToolBatcher(client, server_url)
+    return batchers[server_url]
+
 
-    return all_tools, server_tools_map
+class ToolsCache:
 
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.value = None
+        # /tools response body, encoded once per refresh
+        self.response_bytes = b"[]"
+        self.expires_at = 0.0
 
-tools_cache = None
-server_tools_mapping = {}
+    def invalidate(self):
+        self.expires_at = 0.0
 
 
-async def get_tools():
-    global tools_cache, server_tools_mapping
-    if tools_cache is None:
-        tools_cache, server_tools_mapping = await fetch_tools_from_servers()
-    return tools_cache, server_tools_mapping
+tools_cache = ToolsCache()
 
 
-@app.get("/tools", response_model=List[Dict[str, Any]])
-async def api_get_tools(client_id: Optional[str] = None):
-    print("api_get_tools")
+async def get_tools(client: AsyncClient):
+    if time.monotonic() < tools_cache.expires_at:
+        return tools_cache.value
+    async with tools_cache.lock:
+        # Another request may have refreshed the cache while we waited
+        if time.monotonic() < tools_cache.expires_at:
+            return tools_cache.value
+        tools_cache.value = await fetch_tools_from_servers(client)
+        tools_cache.response_bytes = orjson.dumps(tools_cache.value[0])
+        tools_cache.expires_at = time.monotonic() + TOOLS_CACHE_TTL
+    return tools_cache.value
+
+
+@app.get("/tools")
+async def api_get_tools(client_id: Optional[str] = None,
+                        client: AsyncClient = Depends(get_http_client)):
     """Get available tools endpoint"""
     if not client_id:
         client_id = str(uuid.uuid4())
 
-    await MCPLogger.log_message(client_id, {"event": "get_tools"},
-                                "api_request")
+    MCPLogger.log_message(client_id, {"event": "get_tools"},
+                          "api_request")
 
-    tools, _ = await get_tools()
+    tools, _ = await get_tools(client)
 
-    await MCPLogger.log_message(client_id, {"tools_count": len(tools)},
-                                "api_response")
+    MCPLogger.log_message(client_id, {"tools_count": len(tools)},
+                          "api_response")
 
-    return tools
+    return Response(content=tools_cache.response_bytes,
+                    media_type="application/json")
 
 
-@app.post("/execute", response_model=ToolResponse)
-async def api_execute_tool(request: ExecuteToolRequest):
-    """Execute a tool endpoint"""
+@app.post("/tools/invalidate")
+async def api_invalidate_tools():
+    """Force the next tools request to refetch from the MCP servers"""
+    tools_cache.invalidate()
+    return {"status": "ok"}
+
+
+async def execute_tool(request: ExecuteToolRequest,
+                       client: AsyncClient) -> bytes:
+    """Route a tool call to its MCP server and return the raw JSON result"""
     client_id = request.client_id or str(uuid.uuid4())
 
-    await MCPLogger.log_message(client_id, {
+    MCPLogger.log_message(client_id, {
         "tool": request.tool,
         "input": request.input
     }, "api_request")
@@ -136,76 +408,88 @@ async def api_execute_tool(request: ExecuteToolRequest):
     tool_name = request.tool
     input_data = request.input
 
-    _, server_map = await get_tools()
+    _, server_map = await get_tools(client)
 
     if tool_name not in server_map:
         error_message = f"Tool '{tool_name}' not found."
-        await MCPLogger.log_message(client_id, {"error": error_message},
-                                    "api_error")
+        MCPLogger.log_message(client_id, {"error": error_message},
+                              "api_error")
         raise HTTPException(status_code=404, detail=error_message)
 
     server_url = server_map[tool_name]
 
     try:
-        async with AsyncClient() as client:
-            response = await client.post(f"{server_url}/execute/tool",
-                                         json={
-                                             "tool_name": tool_name,
-                                             "parameters": input_data
-                                         })
-
-            if response.status_code == 200:
-                result = response.json()
-
-                await MCPLogger.log_message(client_id, {"result": result},
-                                            "api_response")
+        status_code, result = await get_batcher(client, server_url).submit(
+            tool_name, input_data)
 
-                return {"result": result}
+        if status_code == 200:
+            if len(result) <= LOG_RESULT_MAX_BYTES:
+                log_content = {"result": orjson.Fragment(result)}
             else:
-                error_message = f"Tool execution failed with status code {response.status_code}"
-                await MCPLogger.log_message(client_id, {
-                    "error": error_message,
-                    "status_code": response.status_code
-                }, "api_error")
-                raise HTTPException(status_code=response.status_code,
-                                    detail=error_message)
+                log_content = {"result_bytes": len(result)}
+            MCPLogger.log_message(client_id, log_content, "api_response")
+
+            return result
+        else:
+            error_message = f"Tool execution failed with status code {status_code}"
+            MCPLogger.log_message(client_id, {
+                "error": error_message,
+                "status_code": status_code
+            }, "api_error")
+            raise HTTPException(status_code=status_code,
+                                detail=error_message)
     except Exception as e:
         error_message = f"Tool execution failed: {str(e)}"
-        await MCPLogger.log_message(client_id, {"error": error_message},
-                                    "api_error")
+        MCPLogger.log_message(client_id, {"error": error_message},
+                              "api_error")
         raise HTTPException(status_code=500, detail=error_message)
 
 
+@app.post("/execute")
+async def api_execute_tool(request: ExecuteToolRequest,
+                           client: AsyncClient = Depends(get_http_client)):
+    """Execute a tool endpoint"""
+    result = await execute_tool(request, client)
+    return ORJSONResponse(content={"result": orjson.Fragment(result)})
+
+
 @app.post("/batch-execute")
-async def api_batch_execute_tools(requests: List[ExecuteToolRequest]):
+async def api_batch_execute_tools(
+        requests: List[ExecuteToolRequest],
+        client: AsyncClient = Depends(get_http_client)):
     """Execute multiple tools in a batch"""
     client_id = requests[
         0].client_id if requests and requests[0].client_id else str(
             uuid.uuid4())
 
-    await MCPLogger.log_message(client_id, {"tools_count": len(requests)},
-                                "api_batch_request")
+    MCPLogger.log_message(client_id, {"tools_count": len(requests)},
+                          "api_batch_request")
+
+    outcomes = await asyncio.gather(
+        *[execute_tool(req, client) for req in requests],
+        return_exceptions=True)
 
     results = []
-    for req in requests:
-        try:
-            result = await api_execute_tool(req)
+    for req, outcome in zip(requests, outcomes):
+        if isinstance(outcome, HTTPException):
             results.append({
                 "tool": req.tool,
-                "success": True,
-                "result": result["result"]
+                "success": False,
+                "error": outcome.detail
             })
-        except HTTPException as e:
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        else:
             results.append({
                 "tool": req.tool,
-                "success": False,
-                "error": e.detail
+                "success": True,
+                "result": orjson.Fragment(outcome)
             })
 
-    await MCPLogger.log_message(client_id, {"results_count": len(results)},
-                                "api_batch_response")
+    MCPLogger.log_message(client_id, {"results_count": len(results)},
+                          "api_batch_response")
 
-    return results
+    return ORJSONResponse(content=results)
 
 
 @app.get("/health")
@@ -217,4 +501,9 @@ async def health_check():
 if __name__ == "__main__":
     import uvicorn
     PORT = int(os.getenv("PORT", 8001))
-    uvicorn.run(app, host="0.0.0.0", port=PORT)
+    uvicorn.run(app,
+                host="0.0.0.0",
+                port=PORT,
+                loop="uvloop" if sys.platform != "win32" else "auto",
+                http="httptools",
+                log_level="warning")
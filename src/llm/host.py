@@ -1,7 +1,10 @@
 import asyncio
+import time
 import uuid
-from typing import Dict, List
+from typing import Dict, List, Optional
 import os
+import sys
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
@@ -9,6 +12,7 @@ from fastapi.responses import FileResponse
 from starlette.websockets import WebSocketState
 
 from llm_mcp_client import LLMMCPClient
+from http_client import close_http_client
 
 
 class ConnectionManager:
@@ -28,8 +32,8 @@ class ConnectionManager:
             print(f"WebSocket connection closed: {connection_id}")
 
     async def send_personal_message(self, message: str, connection_id: str):
-        if connection_id in self.active_connections:
-            websocket = self.active_connections[connection_id]
+        websocket = self.active_connections.get(connection_id)
+        if websocket is not None:
             if websocket.client_state == WebSocketState.CONNECTED:
                 try:
                     await websocket.send_text(message)
@@ -42,11 +46,93 @@ class ConnectionManager:
                 self.disconnect(connection_id)
 
 
-app = FastAPI()
+class StreamCoalescer:
+    """Merges consecutive [LLM] chunks into fewer WebSocket frames.
+
+    Buffered text is sent once it exceeds ``max_bytes``, once ``max_interval``
+    seconds have passed since the last send, or before any other tagged chunk
+    so the frontend still receives exactly one tag per frame. A timer also
+    flushes the buffer ``max_interval`` seconds after text first lands in it,
+    so the bound holds while the model is quiet.
+    """
+
+    LLM_TAG = "[LLM]"
+
+    def __init__(self,
+                 websocket: WebSocket,
+                 max_bytes: int = 8192,
+                 max_interval: float = 0.05):
+        self.websocket = websocket
+        self.max_bytes = max_bytes
+        self.max_interval = max_interval
+        self.buffer: List[str] = []
+        self.buffer_size = 0
+        self.last_send = time.monotonic()
+        # Serializes sends from the caller and the idle flush timer
+        self.lock = asyncio.Lock()
+        self.timer: Optional[asyncio.Task] = None
+
+    async def send(self, chunk: str):
+        if chunk.startswith(self.LLM_TAG):
+            payload = chunk[len(self.LLM_TAG):]
+            self.buffer.append(payload)
+            self.buffer_size += len(payload)
+            if (self.buffer_size >= self.max_bytes or
+                    time.monotonic() - self.last_send >= self.max_interval):
+                await self.flush()
+            elif self.timer is None or self.timer.done():
+                self.timer = asyncio.create_task(self._flush_later())
+            return
+
+        async with self.lock:
+            await self._flush_locked()
+            await self.websocket.send_text(chunk)
+
+    async def flush(self):
+        async with self.lock:
+            await self._flush_locked()
+
+    async def _flush_locked(self):
+        if self.buffer:
+            text = "".join(self.buffer)
+            self.buffer.clear()
+            self.buffer_size = 0
+            await self.websocket.send_text(f"{self.LLM_TAG}{text}")
+        self.last_send = time.monotonic()
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_interval)
+        try:
+            await self.flush()
+        except Exception as e:
+            # The caller sees the same failure on its next send
+            print(f"Error flushing buffered stream text: {e}")
+
+
+# (LLMMCPClient argument, WebSocket query parameter) pairs
+_QUERY_PARAM_MAP = (
+    ("openai_api_key", "api_key"),
+    ("openai_base_url", "base_url"),
+    ("model_name", "model"),
+    ("mcp_client_url", "mcp_url"),
+    ("host_model", "host_model"),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        yield
+    finally:
+        await close_http_client()
+
+
+app = FastAPI(lifespan=lifespan)
 manager = ConnectionManager()
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 static_dir = os.path.join(current_dir, "statics")
+index_html_path = os.path.join(static_dir, "index.html")
 
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
@@ -54,9 +140,8 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 # --- Root Endpoint to Serve index.html ---
 @app.get("/")
 async def get_root():
-    html_file_path = os.path.join(static_dir, "index.html")
-    if os.path.exists(html_file_path):
-        return FileResponse(html_file_path)
+    if os.path.exists(index_html_path):
+        return FileResponse(index_html_path)
     else:
         return {"error": "index.html not found"}, 404
 
@@ -65,21 +150,16 @@ async def get_root():
 async def websocket_endpoint(websocket: WebSocket, connection_id: str):
     await manager.connect(websocket, connection_id)
 
-    # Extract configuration from query parameters
-    query_params = dict(websocket.query_params)
+    # Extract configuration from query parameters, skipping missing values
     llm_config = {
-        "openai_api_key": query_params.get("api_key"),
-        "openai_base_url": query_params.get("base_url"),
-        "model_name": query_params.get("model"),
-        "mcp_client_url": query_params.get("mcp_url"),
-        "host_model": query_params.get("host_model", "openai"),
+        key: value
+        for key, param in _QUERY_PARAM_MAP
+        if (value := websocket.query_params.get(param)) is not None
     }
+    llm_config.setdefault("host_model", "openai")
 
     print(llm_config)
 
-    # Filter out None values
-    llm_config = {k: v for k, v in llm_config.items() if v is not None}
-
     try:
         # Pass the configuration to LLMMCPClient
         async with LLMMCPClient(**llm_config) as mcp_client:
@@ -88,6 +168,7 @@ async def websocket_endpoint(websocket: WebSocket, connection_id: str):
             )
 
             while True:
+                stream = StreamCoalescer(websocket)
                 try:
                     user_message = await websocket.receive_text()
                     print(
@@ -97,11 +178,9 @@ async def websocket_endpoint(websocket: WebSocket, connection_id: str):
                     async for chunk in mcp_client.interactive_stream_chat(
                             user_message):
                         if chunk:
-                            await manager.send_personal_message(
-                                chunk, connection_id)
+                            await stream.send(chunk)
 
-                    await manager.send_personal_message(
-                        "[STREAM_END]", connection_id)
+                    await stream.send("[STREAM_END]")
 
                 except WebSocketDisconnect:
                     print(f"WebSocketDisconnect detected for {connection_id}")
@@ -110,6 +189,13 @@ async def websocket_endpoint(websocket: WebSocket, connection_id: str):
                     print(
                         f"Error during WebSocket communication for {connection_id}: {e}"
                     )
+                    # Deliver text buffered before the failure ahead of the error
+                    try:
+                        await stream.flush()
+                    except Exception as flush_e:
+                        print(
+                            f"Error flushing stream for {connection_id}: {flush_e}"
+                        )
 
                     await manager.send_personal_message(
                         f"[ERROR] An internal error occurred: {str(e)}",
@@ -126,4 +212,10 @@ async def websocket_endpoint(websocket: WebSocket, connection_id: str):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("host:app", host="0.0.0.0", port=7899, reload=True)
+    uvicorn.run("host:app",
+                host="0.0.0.0",
+                port=7899,
+                workers=int(
+                    os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+                loop="uvloop" if sys.platform != "win32" else "auto",
+                http="httptools")
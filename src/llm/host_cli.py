@@ -2,26 +2,35 @@
 import asyncio
 import argparse
 import os
-import json
+import orjson
 import sys
+import time
 from typing import Optional, Dict, Any, List
 
-from rich.console import Console
-from rich.panel import Panel
-from rich.markdown import Markdown
-from rich.syntax import Syntax
-from rich.prompt import Prompt
-from rich.live import Live
-from rich.table import Table
-from rich.box import ROUNDED
-from rich.text import Text
-from rich.spinner import Spinner
-from rich.layout import Layout
-from rich.console import Group
+JSONDecodeError = orjson.JSONDecodeError
 
-from llm_mcp_client import LLMMCPClient
+console = None
 
-console = Console()
+
+def load_rich():
+    """Import Rich on first use so `--help` does not pay for it"""
+    global console, Console, Group, Panel, Markdown, Syntax, Prompt, Live
+    global Table, ROUNDED, Spinner
+    if console is not None:
+        return console
+
+    from rich.console import Console, Group
+    from rich.panel import Panel
+    from rich.markdown import Markdown
+    from rich.syntax import Syntax
+    from rich.prompt import Prompt
+    from rich.live import Live
+    from rich.table import Table
+    from rich.box import ROUNDED
+    from rich.spinner import Spinner
+
+    console = Console()
+    return console
 
 
 def create_parser():
@@ -39,13 +48,21 @@ def create_parser():
     return parser
 
 
+# (config key, environment variable) pairs
+_ENV_MAP = (
+    ("openai_api_key", "OPENAI_API_KEY"),
+    ("openai_base_url", "OPENAI_BASE_URL"),
+    ("model_name", "MODEL_NAME"),
+    ("host_model", "HOST_MODEL"),
+    ("mcp_client_url", "MCP_CLIENT_URL"),
+)
+
+
 def get_config_from_env():
     return {
-        "openai_api_key": os.environ.get("OPENAI_API_KEY"),
-        "openai_base_url": os.environ.get("OPENAI_BASE_URL"),
-        "model_name": os.environ.get("MODEL_NAME"),
-        "host_model": os.environ.get("HOST_MODEL"),
-        "mcp_client_url": os.environ.get("MCP_CLIENT_URL"),
+        key: value
+        for key, env_var in _ENV_MAP
+        if (value := os.environ.get(env_var)) is not None
     }
 
 
@@ -99,7 +116,8 @@ def display_system_message(message):
 
 def format_tool_call(tool_call):
     tool_name = tool_call.get("name", "Unknown Tool")
-    arguments = json.dumps(tool_call.get("arguments", {}), indent=2)
+    arguments = orjson.dumps(tool_call.get("arguments", {}),
+                             option=orjson.OPT_INDENT_2).decode()
 
     table = Table(box=ROUNDED, show_header=True, header_style="bold magenta")
     table.add_column("Tool Call", style="cyan")
@@ -124,7 +142,7 @@ def format_tool_result(tool_result):
     table.add_row("Status", status)
 
     data = tool_result.get("data", {})
-    formatted_data = json.dumps(data, indent=2)
+    formatted_data = orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
 
     return Group(
         table,
@@ -138,18 +156,116 @@ def parse_chunk(chunk):
     if chunk == "[STREAM_END]":
         return "STREAM_END", None
 
-    tag_match = chunk.split("]", 1)
-    if len(tag_match) == 2 and tag_match[0].startswith("["):
-        tag = tag_match[0][1:]  # Remove the opening bracket
-        payload = tag_match[1]
-        return tag, payload
+    if chunk[:1] != "[":
+        return None, chunk
+
+    tag, sep, payload = chunk.partition("]")
+    if not sep:
+        return None, chunk
+    # Interned tags let the HANDLERS lookup match on identity
+    return sys.intern(tag[1:]), payload
+
+
+# Minimum seconds between Markdown re-renders while LLM tokens stream in
+RENDER_INTERVAL = 0.1
+
+
+class StreamState:
+
+    def __init__(self, live):
+        self.live = live
+        self.llm_buffer = ""
+        self.rendered_content = []
+        self.has_llm_content = False
+        self.last_render = 0.0
+        self.render_pending = False
+        # Reused across renders; only rebuilt when llm_buffer has grown
+        self.panel = Panel("",
+                           title="Assistant",
+                           title_align="left",
+                           border_style="green")
+        self.llm_content = ""
+        self.llm_content_len = 0
+
+
+def render_assistant(state):
+    if state.has_llm_content:
+        if state.llm_content_len != len(state.llm_buffer):
+            try:
+                state.llm_content = Markdown(state.llm_buffer)
+            except Exception:
+                state.llm_content = state.llm_buffer
+            state.llm_content_len = len(state.llm_buffer)
+        full_content = Group(state.llm_content, *state.rendered_content)
+    else:
+        full_content = Group(*state.rendered_content)
+
+    state.panel.renderable = full_content
+    state.live.update(state.panel)
+    state.last_render = time.monotonic()
+    state.render_pending = False
+
+
+def _on_llm(payload, state):
+    state.has_llm_content = True
+    state.llm_buffer += payload
+    state.render_pending = True
+    if payload.endswith("\n") or \
+            time.monotonic() - state.last_render > RENDER_INTERVAL:
+        render_assistant(state)
+
+
+def _on_tool_call(payload, state):
+    try:
+        tool_call = orjson.loads(payload)
+    except JSONDecodeError:
+        display_system_message(f"Failed to parse tool call: {payload}")
+        return
+    state.rendered_content.append(format_tool_call(tool_call))
+    render_assistant(state)
+
+
+def _on_tool_result(payload, state):
+    try:
+        tool_result = orjson.loads(payload)
+    except JSONDecodeError:
+        display_system_message(f"Failed to parse tool result: {payload}")
+        return
+    state.rendered_content.append(format_tool_result(tool_result))
+    render_assistant(state)
+
+
+def _on_system(payload, state):
+    state.live.stop()
+    display_system_message(payload)
+    state.live.start()
+
 
-    return None, chunk
+def _on_error(payload, state):
+    state.live.stop()
+    display_system_message(f"Error: {payload}")
+    state.live.start()
+
+
+def _noop(payload, state):
+    pass
+
+
+HANDLERS = {
+    "LLM": _on_llm,
+    "TOOL_CALL": _on_tool_call,
+    "TOOL_RESULT": _on_tool_result,
+    "SYSTEM": _on_system,
+    "ERROR": _on_error,
+}
 
 
 async def main():
     parser = create_parser()
     args = parser.parse_args()
+    load_rich()
+    from llm_mcp_client import LLMMCPClient
+    from http_client import close_http_client
 
     config = get_config_from_env()
 
@@ -164,8 +280,6 @@ async def main():
     if args.mcp_url:
         config["mcp_client_url"] = args.mcp_url
 
-    config = {k: v for k, v in config.items() if v is not None}
-
     config = prompt_for_missing_config(config)
 
     console.print("\n[bold cyan]MCP Assistant CLI[/bold cyan]")
@@ -173,123 +287,48 @@ async def main():
         "Type [bold red]exit[/bold red] or [bold red]quit[/bold red] to end the session\n"
     )
 
-    async with LLMMCPClient(**config) as mcp_client:
-        display_system_message(
-            f"Connected with {config['host_model']} using model {config['model_name']}"
-        )
-
-        while True:
-
-            console.print("\n[bold blue]You:[/bold blue] ", end="")
-            user_message = console.input("")
-
-            if user_message.lower() in ("exit", "quit"):
-                break
-
-            display_user_message(user_message)
-
-            llm_buffer = ""
-            is_streaming_done = False
-            rendered_content = []
-            has_llm_content = False
-
-            with Live(
-                    Spinner("dots", text="Thinking..."),
-                    refresh_per_second=10,
-                    transient=False  # Keep content after Live context exits
-            ) as live:
-                async for chunk in mcp_client.interactive_stream_chat(
-                        user_message):
-                    tag, payload = parse_chunk(chunk)
-
-                    if tag == "LLM" and payload:
-                        has_llm_content = True
-                        llm_buffer += payload
-
-                        try:
-                            md_content = Markdown(llm_buffer)
-                            live.update(
-                                Panel(md_content,
-                                      title="Assistant",
-                                      title_align="left",
-                                      border_style="green"))
-                        except Exception:
-
-                            live.update(
-                                Panel(llm_buffer,
-                                      title="Assistant",
-                                      title_align="left",
-                                      border_style="green"))
-
-                    elif tag == "TOOL_CALL" and payload:
-
-                        try:
-                            tool_call = json.loads(payload)
-                            tool_content = format_tool_call(tool_call)
-                            rendered_content.append(tool_content)
-
-                            if has_llm_content:
-                                full_content = Group(
-                                    Markdown(llm_buffer) if llm_buffer else "",
-                                    *rendered_content)
-                            else:
-                                full_content = Group(*rendered_content)
-
-                            live.update(
-                                Panel(full_content,
-                                      title="Assistant",
-                                      title_align="left",
-                                      border_style="green"))
-                        except json.JSONDecodeError:
-                            display_system_message(
-                                f"Failed to parse tool call: {payload}")
-
-                    elif tag == "TOOL_RESULT" and payload:
-                        try:
-                            tool_result = json.loads(payload)
-                            tool_content = format_tool_result(tool_result)
-                            rendered_content.append(tool_content)
-
-                            if has_llm_content:
-                                full_content = Group(
-                                    Markdown(llm_buffer) if llm_buffer else "",
-                                    *rendered_content)
-                            else:
-                                full_content = Group(*rendered_content)
-
-                            live.update(
-                                Panel(full_content,
-                                      title="Assistant",
-                                      title_align="left",
-                                      border_style="green"))
-                        except json.JSONDecodeError:
-                            display_system_message(
-                                f"Failed to parse tool result: {payload}")
-
-                    elif tag == "SYSTEM" and payload:
-
-                        live.stop()
-                        display_system_message(payload)
-                        live.start()
-
-                    elif tag == "ERROR" and payload:
-
-                        live.stop()
-                        display_system_message(f"Error: {payload}")
-                        live.start()
-
-                    elif tag == "STREAM_END":
-                        is_streaming_done = True
-
-                        break
+    try:
+        async with LLMMCPClient(**config) as mcp_client:
+            display_system_message(
+                f"Connected with {config['host_model']} using model {config['model_name']}"
+            )
+
+            while True:
+
+                console.print("\n[bold blue]You:[/bold blue] ", end="")
+                user_message = console.input("")
+
+                if user_message.lower() in ("exit", "quit"):
+                    break
+
+                display_user_message(user_message)
+
+                with Live(
+                        Spinner("dots", text="Thinking..."),
+                        refresh_per_second=10,
+                        transient=False  # Keep content after Live context exits
+                ) as live:
+                    state = StreamState(live)
+                    async for chunk in mcp_client.interactive_stream_chat(
+                            user_message):
+                        tag, payload = parse_chunk(chunk)
+                        if tag == "STREAM_END":
+                            break
+                        if payload:
+                            HANDLERS.get(tag, _noop)(payload, state)
+
+                    if state.render_pending:
+                        render_assistant(state)
+    finally:
+        await close_http_client()
 
 
 if __name__ == "__main__":
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        console.print("\n[bold red]Session terminated by user[/bold red]")
+        load_rich().print("\n[bold red]Session terminated by user[/bold red]")
         sys.exit(0)
     except Exception as e:
-        console.print(f"\n[bold red]Error: {str(e)}[/bold red]")
+        load_rich().print(f"\n[bold red]Error: {str(e)}[/bold red]")
         sys.exit(1)
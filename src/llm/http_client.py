@@ -0,0 +1,32 @@
+from typing import Optional
+
+from httpx import AsyncClient, Limits, Timeout
+
+_http_client: Optional[AsyncClient] = None
+
+
+def get_http_client() -> AsyncClient:
+    """Return the process-wide AsyncClient, creating it on first use.
+
+    Sharing one client keeps connections to the MCP client hub alive across
+    LLMMCPClient instances instead of re-handshaking for every session.
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = AsyncClient(timeout=Timeout(connect=5,
+                                                   read=120,
+                                                   write=30,
+                                                   pool=10),
+                                   limits=Limits(max_connections=200,
+                                                 max_keepalive_connections=100,
+                                                 keepalive_expiry=30),
+                                   http2=True)
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared client; call once at process shutdown"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
@@ -1,16 +1,110 @@
 import asyncio
+import hashlib
 import json
+import logging
 import os
+import random
 import re
+import time
 import uuid
-from typing import Dict, List, Any, Optional, Union, Literal
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple, Union, Literal
 from dotenv import load_dotenv
-from httpx import AsyncClient, Timeout
+from http_client import get_http_client
 from providers.openai import OpenAIProvider
 from json_repair import json_repair
 
 load_dotenv()
 
+logger = logging.getLogger("nano_mcp")
+
+
+def _stdlib_json_dumps(obj: Any, indent: bool = False) -> str:
+    return json.dumps(obj, indent=2 if indent else None)
+
+
+try:
+    import orjson
+
+    def json_dumps(obj: Any, indent: bool = False) -> str:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option).decode()
+        except TypeError:
+            # e.g. integers beyond 64 bits in LLM-supplied arguments
+            return _stdlib_json_dumps(obj, indent)
+
+    json_loads = orjson.loads
+except ImportError:
+    json_dumps = _stdlib_json_dumps
+    json_loads = json.loads
+
+# Backoff between tool execution retries: base * 2**attempt capped, plus jitter
+RETRY_BASE_DELAY = 0.25
+RETRY_MAX_DELAY = 4.0
+RETRY_JITTER = 0.25
+# Client errors that may still succeed on retry
+RETRIABLE_4XX = frozenset({408, 429})
+
+# Seconds between idle pings that keep pooled hub connections alive
+KEEPALIVE_INTERVAL = 20.0
+
+# Read-only tools whose results may be reused until another tool runs
+CACHEABLE_TOOLS = frozenset({"read_file", "show_folder_tree"})
+TOOL_CACHE_MAXSIZE = 512
+# Files also change outside this session (other sessions, background
+# commands), so cached reads are only trusted briefly
+TOOL_CACHE_TTL = 5.0
+# Success-shaped results that report a missing path or a failure; the path
+# may be created at any moment, so these are never cached
+UNCACHEABLE_RESULT_PREFIXES = ("File not found", "Directory not found",
+                               "Error reading file", "Error listing directory")
+
+TOOL_CALL_OPEN_TAG = "<mcp_tool_call>"
+TOOL_CALL_CLOSE_TAG = "</mcp_tool_call>"
+TOOL_NAME_OPEN_TAG = "<tool_name>"
+TOOL_NAME_CLOSE_TAG = "</tool_name>"
+ARGUMENTS_OPEN_TAG = "<arguments>"
+ARGUMENTS_CLOSE_TAG = "</arguments>"
+
+
+def _extract_tool_call(content: str) -> Optional[Tuple[str, str]]:
+    """Return (raw block, inner content) of the first complete tool call block"""
+    open_idx = content.find(TOOL_CALL_OPEN_TAG)
+    if open_idx == -1:
+        return None
+    inner_start = open_idx + len(TOOL_CALL_OPEN_TAG)
+    close_idx = content.find(TOOL_CALL_CLOSE_TAG, inner_start)
+    if close_idx == -1:
+        return None
+    return (content[open_idx:close_idx + len(TOOL_CALL_CLOSE_TAG)],
+            content[inner_start:close_idx])
+
+
+def _split_tool_call(body: str) -> Optional[Tuple[str, str]]:
+    """Return (tool name, arguments string); the closing </arguments> tag is optional"""
+    name_start = body.find(TOOL_NAME_OPEN_TAG)
+    if name_start == -1:
+        return None
+    name_start += len(TOOL_NAME_OPEN_TAG)
+    name_end = body.find(TOOL_NAME_CLOSE_TAG, name_start)
+    if name_end == -1:
+        return None
+    args_start = body.find(ARGUMENTS_OPEN_TAG,
+                           name_end + len(TOOL_NAME_CLOSE_TAG))
+    if args_start == -1:
+        return None
+    arguments_str = body[args_start + len(ARGUMENTS_OPEN_TAG):].strip()
+    arguments_str = arguments_str.removesuffix(ARGUMENTS_CLOSE_TAG).rstrip()
+    return body[name_start:name_end].strip(), arguments_str
+
+
+# Prefix of the history message carrying tool results back to the LLM
+TOOL_RESULTS_PREFIX = "Executed tools with results:"
+_TOOL_RESULT_NAME_RE = re.compile(r'"tool_name":\s*"((?:[^"\\]|\\.)*)"')
+
 INTERACTIVE_SYSTEM_PROMPT_TEMPLATE = """
 You are an AI assistant that functions **exclusively** by using external tools via the Model Context Protocol (MCP) to fulfill user requests. Your **only** way to interact with the environment or perform actions is through the provided tools. Follow a Think -> Act -> Observe -> Communicate -> Repeat loop continuously until the task is complete. You must work autonomously without waiting for user confirmation between steps unless absolutely necessary.
 
@@ -86,10 +180,18 @@ class LLMMCPClient:
                  provider_type: Literal["openai"] = "openai",
                  host_model: Literal["openai", "groq"] = "openai"):
         self.client_id = str(uuid.uuid4())
-        self.http_client = AsyncClient(timeout=Timeout(30.0))
+        self.http_client = get_http_client()
         self.tools = []
         self.messages = []
         self.initialized = False
+        self.batch_execute_supported = True
+        # key -> (expires at, result)
+        self._tool_cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Prompt fragments derived from self.tools, reset in fetch_tools
+        self._tools_section_cache = None
+        self._system_prompt_cache = None
+        # Tool-result blocks beyond the most recent few are replaced by stubs
+        self.history_keep_tool_results = 5
         self.openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
         self.openai_base_url = openai_base_url or os.getenv("OPENAI_BASE_URL")
         self.model_name = model_name or os.getenv("OPENAI_MODEL")
@@ -107,7 +209,8 @@ class LLMMCPClient:
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.http_client.aclose()
+        # The shared HTTP client outlives this session; see close_http_client
+        pass
 
     async def initialize(self):
         """Initialize the client by fetching tools and creating system prompt"""
@@ -118,6 +221,17 @@ class LLMMCPClient:
             self.initialized = True
         return self
 
+    async def keepalive(self, interval: float = KEEPALIVE_INTERVAL):
+        """Ping the MCP client hub periodically so pooled connections stay warm"""
+        if not self.mcp_client_url:
+            return
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.http_client.get(f"{self.mcp_client_url}/health")
+            except Exception as e:
+                logger.warning("Keepalive ping failed: %s", e)
+
     async def fetch_tools(self):
         """Fetch available tools from the MCP server using the API"""
         if not self.mcp_client_url:
@@ -128,17 +242,87 @@ class LLMMCPClient:
                 params={"client_id": self.client_id})
 
             if response.status_code == 200:
-                self.tools = response.json()
+                tools = json_loads(response.content)
+                if tools != self.tools:
+                    self.tools = tools
+                    self._invalidate_prompt_cache()
                 return self.tools
             else:
-                print(f"Error fetching tools: {response.text}")
+                logger.error("Error fetching tools: %s", response.text)
                 return []
         except Exception as e:
-            print(f"Error fetching tools: {e}")
+            logger.error("Error fetching tools: %s", e)
             return []
 
+    def _invalidate_prompt_cache(self):
+        self._tools_section_cache = None
+        self._system_prompt_cache = None
+
+    @staticmethod
+    def _canonical_call(tool_name: str,
+                        tool_input: Union[Dict[str, Any], None]) -> str:
+        return json.dumps({"t": tool_name, "i": tool_input},
+                          sort_keys=True,
+                          default=str)
+
+    def _tool_cache_lookup(self, tool_name: str,
+                           tool_input: Union[Dict[str, Any], None]):
+        """Return (cache key, cached result) for a read-only tool call"""
+        if tool_name not in CACHEABLE_TOOLS:
+            return None, None
+        canonical = self._canonical_call(tool_name, tool_input)
+        key = hashlib.sha256(canonical.encode()).hexdigest()
+        entry = self._tool_cache.get(key)
+        if entry is None:
+            return key, None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._tool_cache[key]
+            return key, None
+        self._tool_cache.move_to_end(key)
+        return key, result
+
+    def _tool_cache_store(self, tool_name: str, key: Optional[str],
+                          result: Any):
+        if tool_name not in CACHEABLE_TOOLS:
+            # Any other tool may change files, so cached reads are stale
+            self._tool_cache.clear()
+            return
+        if isinstance(result, dict) and ("error" in result or str(
+                result.get("text", "")).startswith(UNCACHEABLE_RESULT_PREFIXES)):
+            return
+        self._tool_cache[key] = (time.monotonic() + TOOL_CACHE_TTL, result)
+        if len(self._tool_cache) > TOOL_CACHE_MAXSIZE:
+            self._tool_cache.popitem(last=False)
+
     async def execute_tool(self, tool_name: str,
                            tool_input: Union[Dict[str, Any], None]):
+        """Execute a tool, serving repeated read-only calls from the cache"""
+        key, cached = self._tool_cache_lookup(tool_name, tool_input)
+        if cached is not None:
+            return cached
+        result = await self._post_tool(tool_name, tool_input)
+        self._tool_cache_store(tool_name, key, result)
+        return result
+
+    @staticmethod
+    def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+        """Exponential backoff with jitter, honouring Retry-After up to RETRY_MAX_DELAY"""
+        delay = min(RETRY_BASE_DELAY * (2**attempt),
+                    RETRY_MAX_DELAY) + random.random() * RETRY_JITTER
+        if retry_after:
+            try:
+                requested = float(retry_after)
+            except ValueError:
+                # HTTP-date form is not worth parsing for a local hub
+                return delay
+            # Never let a server stall the client beyond the usual cap
+            if requested >= 0:
+                delay = max(delay, min(requested, RETRY_MAX_DELAY))
+        return delay
+
+    async def _post_tool(self, tool_name: str,
+                         tool_input: Union[Dict[str, Any], None]):
         """Execute a tool using the API"""
         try:
             max_retries = 3
@@ -153,33 +337,108 @@ class LLMMCPClient:
                         })
 
                     if response.status_code == 200:
-                        result = response.json()
+                        result = json_loads(response.content)
                         return result.get("result", {})
                     else:
-                        print(f"Error executing tool: {response.text}")
-                        if attempt < max_retries - 1:
-                            await asyncio.sleep(1)  # Wait before retry
+                        logger.warning("Error executing tool %s: %s",
+                                       tool_name, response.text)
+                        retriable = (response.status_code >= 500 or
+                                     response.status_code in RETRIABLE_4XX)
+                        if retriable and attempt < max_retries - 1:
+                            await asyncio.sleep(
+                                self._retry_delay(
+                                    attempt,
+                                    response.headers.get("Retry-After")))
                             continue
                         return {
                             "error":
                             f"Tool execution failed with status {response.status_code}: {response.text}"
                         }
                 except Exception as e:
-                    print(
-                        f"Error executing tool (attempt {attempt+1}/{max_retries}): {e}"
-                    )
+                    logger.warning("Error executing tool (attempt %d/%d): %s",
+                                   attempt + 1, max_retries, e)
                     if attempt < max_retries - 1:
-                        await asyncio.sleep(1)
+                        await asyncio.sleep(self._retry_delay(attempt))
                     else:
                         return {"error": str(e)}
 
             return {"error": "Maximum retries exceeded"}
         except Exception as e:
-            print(f"Error executing tool: {str(e)}")
+            logger.error("Error executing tool %s: %s", tool_name, e)
             return {"error": str(e)}
 
+    async def _execute_tools_concurrently(self,
+                                          tool_calls: List[Dict[str, Any]]):
+        """Fallback for hubs without /batch-execute: run calls concurrently"""
+        results = await asyncio.gather(*[
+            self.execute_tool(call["tool_name"], call["arguments"])
+            for call in tool_calls
+        ])
+        batch_results = []
+        for call, result in zip(tool_calls, results):
+            if isinstance(result, dict) and "error" in result:
+                batch_results.append({
+                    "tool": call["tool_name"],
+                    "success": False,
+                    "error": result["error"]
+                })
+            else:
+                batch_results.append({
+                    "tool": call["tool_name"],
+                    "success": True,
+                    "result": result
+                })
+        return batch_results
+
     async def execute_batch_tools(self, tool_calls: List[Dict[str, Any]]):
-        """Execute multiple tools in a batch"""
+        """Execute multiple tools in a batch, sending only cache misses"""
+        lookups = [
+            self._tool_cache_lookup(call["tool_name"], call["arguments"])
+            for call in tool_calls
+        ]
+        # Identical calls in one batch are sent once and fanned back out
+        misses = []
+        miss_slots = {}
+        slots = []
+        for call, (_, cached) in zip(tool_calls, lookups):
+            if cached is not None:
+                slots.append(None)
+                continue
+            canonical = self._canonical_call(call["tool_name"],
+                                             call["arguments"])
+            slot = miss_slots.get(canonical)
+            if slot is None:
+                slot = miss_slots[canonical] = len(misses)
+                misses.append(call)
+            slots.append(slot)
+        miss_results = await self._execute_batch_uncached(
+            misses) if misses else []
+        if len(miss_results) != len(misses):
+            # Whole-batch failure; pass the error through unchanged
+            return miss_results
+
+        results = []
+        for call, (key, cached), slot in zip(tool_calls, lookups, slots):
+            if cached is not None:
+                results.append({
+                    "tool": call["tool_name"],
+                    "success": True,
+                    "result": cached
+                })
+                continue
+            result = miss_results[slot]
+            if call["tool_name"] not in CACHEABLE_TOOLS:
+                self._tool_cache.clear()
+            elif result.get("success") and "result" in result:
+                self._tool_cache_store(call["tool_name"], key,
+                                       result["result"])
+            results.append(result)
+        return results
+
+    async def _execute_batch_uncached(self,
+                                      tool_calls: List[Dict[str, Any]]):
+        if not self.batch_execute_supported:
+            return await self._execute_tools_concurrently(tool_calls)
         try:
             batch_requests = []
             for call in tool_calls:
@@ -193,162 +452,216 @@ class LLMMCPClient:
                 f"{self.mcp_client_url}/batch-execute", json=batch_requests)
 
             if response.status_code == 200:
-                return response.json()
+                return json_loads(response.content)
+            elif response.status_code in (404, 405):
+                self.batch_execute_supported = False
+                return await self._execute_tools_concurrently(tool_calls)
             else:
-                print(f"Error executing batch tools: {response.text}")
+                logger.error("Error executing batch tools: %s",
+                             response.text)
                 return [{"error": f"Batch execution failed: {response.text}"}]
         except Exception as e:
-            print(f"Error executing batch tools: {e}")
+            logger.error("Error executing batch tools: %s", e)
             return [{"error": str(e)}]
 
-    def format_tools_for_prompt(self):
-        tools_section = ""
-        for tool in self.tools:
-            name = tool.get("name", "")
-            description = tool.get("description", "")
-            parameters = tool.get("parameters", {})
+    @staticmethod
+    def _format_tool_block(tool: Dict[str, Any]) -> str:
+        name = tool.get("name", "")
+        description = tool.get("description", "")
+        parameters = tool.get("parameters", {})
 
-            tools_section += f"---\n**Tool Name:** `{name}`\n"
-            tools_section += f"*   **Description:** {description}\n"
-            tools_section += "*   **Parameters (JSON Schema):**\n"
-            tools_section += "```json\n"
-            tools_section += json.dumps(parameters, indent=2)
-            tools_section += "\n```\n---\n"
+        return (f"---\n**Tool Name:** `{name}`\n"
+                f"*   **Description:** {description}\n"
+                "*   **Parameters (JSON Schema):**\n"
+                "```json\n"
+                f"{json_dumps(parameters, indent=True)}"
+                "\n```\n---\n")
 
-        return tools_section
+    def format_tools_for_prompt(self):
+        if self._tools_section_cache is None:
+            self._tools_section_cache = "".join(
+                self._format_tool_block(tool) for tool in self.tools)
+        return self._tools_section_cache
 
     def create_system_prompt(self):
-        tools_section = self.format_tools_for_prompt()
-        return INTERACTIVE_SYSTEM_PROMPT_TEMPLATE.format(
-            tools_section=tools_section)
-
-    async def parse_tool_calls(self, content: str) -> List[Dict[str, Any]]:
-        """Parse tool calls from LLM response, handling potentially missing closing tags."""
-        block_pattern = r'<mcp_tool_call>(.*?)</mcp_tool_call>'
-        block_match = re.search(block_pattern, content, re.DOTALL)
-
-        if not block_match:
-
-            inner_pattern_check = r'^\s*<tool_name>(.*?)</tool_name>\s*<arguments>(.*?)($|</arguments>\s*$)'  # Allow missing or present closing tag
-            inner_match_check = re.match(inner_pattern_check, content.strip(),
-                                         re.DOTALL)
-            if inner_match_check:
-
-                tool_name = inner_match_check.group(1).strip()
-                arguments_str = inner_match_check.group(2).strip()
-                block_content_to_parse = None  # Signal that we parsed directly
-            else:
+        if self._system_prompt_cache is None:
+            self._system_prompt_cache = INTERACTIVE_SYSTEM_PROMPT_TEMPLATE.format(
+                tools_section=self.format_tools_for_prompt())
+        return self._system_prompt_cache
+
+    async def parse_tool_calls(self,
+                               content: str,
+                               block: Optional[str] = None
+                               ) -> List[Dict[str, Any]]:
+        """Parse tool calls from LLM response, handling potentially missing closing tags.
+
+        ``block`` is the inner content of an already extracted tool call block.
+        """
+        if block is None:
+            extracted = _extract_tool_call(content)
+            if extracted is not None:
+                block = extracted[1]
+
+        if block is None:
+            stripped = content.strip()
+            if not stripped.startswith(TOOL_NAME_OPEN_TAG):
+                return []
+            parts = _split_tool_call(stripped)
+            if parts is None:
                 return []
         else:
-            block_content_to_parse = block_match.group(1).strip()
-            tool_name = None
-            arguments_str = None
-
-        tool_calls = []
-        if block_content_to_parse is not None:
-            tool_name_pattern = r'<tool_name>(.*?)</tool_name>'
-            arguments_start_pattern = r'<arguments>'
-
-            tool_name_match = re.search(tool_name_pattern,
-                                        block_content_to_parse, re.DOTALL)
-            arguments_start_match = re.search(arguments_start_pattern,
-                                              block_content_to_parse,
-                                              re.DOTALL)
-
-            if not tool_name_match or not arguments_start_match:
-                print(
-                    f"Could not find required <tool_name> or <arguments> start tag within the block: <<<'{block_content_to_parse}'>>>"
-                )
+            parts = _split_tool_call(block)
+            if parts is None:
+                logger.warning(
+                    "Could not find required <tool_name> or <arguments> start tag within the block: <<<'%s'>>>",
+                    block.strip())
                 return []
 
-            tool_name = tool_name_match.group(1).strip()
-            args_start_index = arguments_start_match.end()
-            arguments_str = block_content_to_parse[args_start_index:].strip()
-
-        if tool_name is not None and arguments_str is not None:
-            try:
-                print(
-                    f"Attempting to repair and parse arguments: <<<'{arguments_str}'>>>"
-                )
-                if not arguments_str:
-                    arguments = {}
-                    print("Arguments string was empty, parsed as {}")
-                else:
-
-                    repaired_json_str = json_repair.repair_json(
-                        arguments_str, return_objects=False)
-                    arguments = json.loads(repaired_json_str)
-                    print("JSON repair and loading succeeded.")
-
-                tool_calls.append({
-                    "tool_name": tool_name,
-                    "arguments": arguments
-                })
-            except Exception as e:
+        tool_name, arguments_str = parts
+        tool_calls = []
+        try:
+            logger.debug("Attempting to repair and parse arguments: <<<'%s'>>>",
+                         arguments_str)
+            if not arguments_str:
+                arguments = {}
+                logger.debug("Arguments string was empty, parsed as {}")
+            else:
+                # Returns Python objects directly, skipping a dump + loads
+                arguments = json_repair.repair_json(arguments_str,
+                                                    return_objects=True)
+                logger.debug("JSON repair and loading succeeded.")
+
+            tool_calls.append({
+                "tool_name": tool_name,
+                "arguments": arguments
+            })
+        except Exception as e:
 
-                print(
-                    f"Failed to parse arguments JSON even after repair attempt: {e} \nArguments string was: <<<'{arguments_str}'>>> \nSkipping this tool call."
-                )
+            logger.error(
+                "Failed to parse arguments JSON even after repair attempt: %s \nArguments string was: <<<'%s'>>> \nSkipping this tool call.",
+                e, arguments_str)
 
         return tool_calls
 
-    async def _add_message_openai(self,
-                                  role: str,
-                                  content: str,
-                                  no_tool: bool = False):
+    def _add_message_openai(self,
+                            role: str,
+                            content: str,
+                            no_tool: bool = False):
         """Add a message to the conversation history for OpenAI"""
         if role == "assistant":
             if self.messages and self.messages[-1]["role"] == "assistant":
+                last = self.messages[-1]
+                if isinstance(content, str) and isinstance(
+                        last["content"], str):
+                    last["content"] += content
+                    return
+                # Only switch to the typed list once structured content shows up
+                if isinstance(last["content"], str):
+                    last["content"] = [{
+                        "type": "text",
+                        "text": last["content"]
+                    }] if last["content"] else []
                 if isinstance(content, dict):
-                    self.messages[-1]["content"].append(content)
+                    last["content"].append(content)
                 elif isinstance(content, list):
-                    self.messages[-1]["content"].extend(content)
+                    last["content"].extend(content)
                 else:
-                    self.messages[-1]["content"].append({
-                        "type": "text",
-                        "text": content
-                    })
+                    last["content"].append({"type": "text", "text": content})
             else:
                 self.messages.append({
                     "role":
                     "assistant",
-                    "content": [content] if isinstance(content, dict) else
-                    content if isinstance(content, list) else [{
-                        "type": "text",
-                        "text": content
-                    }]
+                    "content":
+                    [content] if isinstance(content, dict) else content
                 })
         else:
             self.messages.append({"role": role, "content": content})
 
-    async def _add_message_groq(self,
-                                role: str,
-                                content: str,
-                                no_tool: bool = False):
+    def _add_message_groq(self,
+                          role: str,
+                          content: str,
+                          no_tool: bool = False):
         """Add a message to the conversation history for Groq"""
         if no_tool:
             self.messages.append({"role": role, "content": f'{content}'})
         else:
             self.messages.append({"role": "system", "content": f'{content}'})
 
-    async def add_message(self,
-                          role: str,
-                          content: str,
-                          no_tool: bool = False):
-        """Add a message to the conversation history"""
-        if not self.initialized:
-            await self.initialize()
+    def add_message(self, role: str, content: str, no_tool: bool = False):
+        """Add a message to the conversation history.
 
+        The client must already be initialized; see initialize().
+        """
         if self.host_model == "openai":
-            await self._add_message_openai(role, content, no_tool)
+            self._add_message_openai(role, content, no_tool)
         elif self.host_model == "groq":
-            await self._add_message_groq(role, content, no_tool)
+            self._add_message_groq(role, content, no_tool)
         return self.messages
 
-    async def _append_last(self, last_role: str, content: str):
-        last_message = list(
-            filter(lambda x: x["role"] == last_role, self.messages))[-1]
-        last_message["content"] += content
+    def _append_last(self, last_role: str, content: str):
+        for message in reversed(self.messages):
+            if message["role"] != last_role:
+                continue
+            if not isinstance(message["content"], list):
+                message["content"] += content
+            elif isinstance(content, list):
+                message["content"].extend(content)
+            elif isinstance(content, dict):
+                message["content"].append(content)
+            else:
+                message["content"].append({"type": "text", "text": content})
+            return
+
+    @staticmethod
+    def _stub_tool_results(text: str, limit: int) -> str:
+        """Replace the first ``limit`` tool-results JSON blocks in text with one-line stubs"""
+        parts = []
+        pos = 0
+        while limit > 0 and (start := text.find(TOOL_RESULTS_PREFIX,
+                                                pos)) != -1:
+            # Only the closing bracket of the indented top-level list sits at
+            # the start of a line
+            end = text.find("\n]", start)
+            if end == -1:
+                break
+            end += 2
+            names = _TOOL_RESULT_NAME_RE.findall(text, start, end)
+            parts.append(text[pos:start])
+            parts.append(" ".join(f"[tool call {n}: {name} -> pruned]"
+                                  for n, name in enumerate(names, 1)))
+            pos = end
+            limit -= 1
+        if not parts:
+            return text
+        parts.append(text[pos:])
+        return "".join(parts)
+
+    def _prune_history(self):
+        """Stub out all but the last history_keep_tool_results tool-result blocks.
+
+        Blocks are counted across the whole history, including the assistant
+        message the current ReAct loop keeps appending to, so a single long
+        turn is bounded as well.
+        """
+        # (holder, key) of every text in the history, oldest first
+        slots = []
+        for message in self.messages:
+            content = message["content"]
+            if isinstance(content, str):
+                slots.append((message, "content"))
+            elif isinstance(content, list):
+                slots.extend((part, "text") for part in content
+                             if isinstance(part, dict) and "text" in part)
+        counts = [holder[key].count(TOOL_RESULTS_PREFIX)
+                  for holder, key in slots]
+        excess = sum(counts) - self.history_keep_tool_results
+        for (holder, key), count in zip(slots, counts):
+            if excess <= 0:
+                break
+            if count:
+                holder[key] = self._stub_tool_results(holder[key],
+                                                      min(count, excess))
+                excess -= min(count, excess)
 
     async def interactive_stream_chat(self,
                                       user_message: str = None,
@@ -359,7 +672,9 @@ class LLMMCPClient:
         Yield Format: [TAG]Payload
         Tags: [LLM], [RAW_TOOL_CALL], [TOOL_CALL], [TOOL_RESULT], [SYSTEM], [ERROR]
         """
-        # print(f"MESSAGE: \n{json.dumps(self.messages, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("MESSAGE: \n%s", json_dumps(self.messages,
+                                                      indent=True))
         if depth >= max_depth:
             yield "[SYSTEM]Maximum tool call depth reached. Stopping here."
             return
@@ -368,33 +683,40 @@ class LLMMCPClient:
             await self.initialize()
 
         if user_message and depth == 0:
-            await self.add_message("user", user_message, no_tool=True)
+            self.add_message("user", user_message, no_tool=True)
+
+        self._prune_history()
 
         stream_iterator = self.llm_host.stream(self.messages, self.model_name)
-        full_response_segment = ""
+        # Chunks are joined once at the end; only a short tail is rescanned
+        response_parts = []
+        tail = ""
+        tail_len = len(TOOL_CALL_CLOSE_TAG) - 1
         tool_call_detected = False
         llm_output_started = False
         raw_tool_call_block_yielded = False  # Flag to prevent duplicate yields if stream breaks oddly
+        tool_call_block = None
 
         try:
             async for chunk in stream_iterator:
                 if chunk:
-                    full_response_segment += chunk
+                    response_parts.append(chunk)
+                    window = tail + chunk
 
-                    if "</mcp_tool_call>" not in full_response_segment:
+                    if window.find(TOOL_CALL_CLOSE_TAG) == -1:
                         yield f"[LLM]{chunk}"
                         llm_output_started = True
+                        tail = window[-tail_len:]
                     elif not tool_call_detected:
                         tool_call_detected = True
 
                         raw_tool_call_block = None
 
-                        block_pattern = r'(<mcp_tool_call>.*?</mcp_tool_call>)'
-                        block_match = re.search(block_pattern,
-                                                full_response_segment,
-                                                re.DOTALL)
-                        if block_match:
-                            raw_tool_call_block = block_match.group(1).strip()
+                        extracted = _extract_tool_call(
+                            "".join(response_parts))
+                        if extracted:
+                            raw_tool_call_block = extracted[0].strip()
+                            tool_call_block = extracted[1]
 
                         yield "[SYSTEM]Tool call detected. Processing..."
 
@@ -406,18 +728,19 @@ class LLMMCPClient:
 
         except Exception as e:
             yield f"[ERROR]Error during LLM stream: {e}"
-            await self.add_message("assistant",
-                                   f"Error during LLM stream: {e}")
+            self.add_message("assistant", f"Error during LLM stream: {e}")
             return
 
+        full_response_segment = "".join(response_parts)
         if full_response_segment:
-            await self.add_message("assistant",
-                                   full_response_segment,
-                                   no_tool=not tool_call_detected)
+            self.add_message("assistant",
+                             full_response_segment,
+                             no_tool=not tool_call_detected)
 
         if tool_call_detected:
 
-            tool_calls = await self.parse_tool_calls(full_response_segment)
+            tool_calls = await self.parse_tool_calls(full_response_segment,
+                                                     tool_call_block)
 
             if tool_calls:
 
@@ -432,7 +755,7 @@ class LLMMCPClient:
                             arguments = tool_calls[i]["arguments"]
                             success = result.get("success", True)
 
-                            yield f"[TOOL_CALL]{json.dumps({'name': tool_name, 'arguments': arguments})}"
+                            yield f"[TOOL_CALL]{json_dumps({'name': tool_name, 'arguments': arguments})}"
 
                             if success:
                                 res_data = result.get("result", {})
@@ -444,7 +767,7 @@ class LLMMCPClient:
                                     "result":
                                     res_data
                                 })
-                                yield f"[TOOL_RESULT]{json.dumps({'name': tool_name, 'status': 'success', 'data': res_data})}"
+                                yield f"[TOOL_RESULT]{json_dumps({'name': tool_name, 'status': 'success', 'data': res_data})}"
                             else:
                                 error_msg = result.get("error",
                                                        "Unknown error")
@@ -456,13 +779,13 @@ class LLMMCPClient:
                                     "error":
                                     error_msg
                                 })
-                                yield f"[TOOL_RESULT]{json.dumps({'name': tool_name, 'status': 'error', 'data': error_msg})}"
+                                yield f"[TOOL_RESULT]{json_dumps({'name': tool_name, 'status': 'error', 'data': error_msg})}"
                 else:
                     for tool_call in tool_calls:
                         tool_name = tool_call["tool_name"]
                         arguments = tool_call["arguments"]
 
-                        yield f"[TOOL_CALL]{json.dumps({'name': tool_name, 'arguments': arguments})}"
+                        yield f"[TOOL_CALL]{json_dumps({'name': tool_name, 'arguments': arguments})}"
 
                         result = await self.execute_tool(tool_name, arguments)
                         if "error" in result:
@@ -472,21 +795,21 @@ class LLMMCPClient:
                                 "arguments": arguments,
                                 "error": error_msg
                             })
-                            yield f"[TOOL_RESULT]{json.dumps({'name': tool_name, 'status': 'error', 'data': error_msg})}"
+                            yield f"[TOOL_RESULT]{json_dumps({'name': tool_name, 'status': 'error', 'data': error_msg})}"
                         else:
                             tool_results_for_history.append({
                                 "tool_name": tool_name,
                                 "arguments": arguments,
                                 "result": result
                             })
-                            yield f"[TOOL_RESULT]{json.dumps({'name': tool_name, 'status': 'success', 'data': result})}"
+                            yield f"[TOOL_RESULT]{json_dumps({'name': tool_name, 'status': 'success', 'data': result})}"
 
                 yield "[LLM]___\n\n"
 
-                tool_result_content = "Executed tools with results:\n" + json.dumps(
-                    tool_results_for_history, indent=2)
+                tool_result_content = f"{TOOL_RESULTS_PREFIX}\n" + json_dumps(
+                    tool_results_for_history, indent=True)
                 # tool_result_content += "\n\nRespond to the user with the results and move forward to observation, planning, and action."
-                await self.add_message("assistant", tool_result_content)
+                self.add_message("assistant", tool_result_content)
 
                 yield "[SYSTEM]Tool execution finished. Asking LLM to continue..."
 
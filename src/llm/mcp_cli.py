@@ -1,14 +1,49 @@
 import asyncio
 import json
+import logging
 import os
 import sys
+import threading
 import traceback
 from typing import List, Dict
 from dotenv import load_dotenv
 from llm_mcp_client import LLMMCPClient
+from http_client import close_http_client
 
 load_dotenv()
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
+
+
+def _settle(future: asyncio.Future, result=None, error=None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+async def ainput(prompt: str = "") -> str:
+    """Read a line without blocking the event loop.
+
+    A daemon thread is used instead of asyncio.to_thread so that Ctrl+C does
+    not hang waiting on the pending input() call at interpreter shutdown.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def read():
+        try:
+            line = input(prompt)
+        except BaseException as e:
+            loop.call_soon_threadsafe(_settle, future, None, e)
+        else:
+            loop.call_soon_threadsafe(_settle, future, line)
+
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
 
 async def interactive_cli():
     """Interactive CLI for the MCP client"""
@@ -29,10 +64,11 @@ async def interactive_cli():
         else:
             print(f"Available tools: {len(mcp_client.tools)}")
 
+        keepalive_task = asyncio.create_task(mcp_client.keepalive())
         try:
             while True:
-                # Get user input
-                user_input = input("\nYou: ").strip()
+                # Get user input without blocking the event loop
+                user_input = (await ainput("\nYou: ")).strip()
 
                 if user_input.lower() in ["exit", "quit"]:
                     print("Exiting...")
@@ -70,11 +106,15 @@ async def interactive_cli():
 
                 print()  # Extra newline for readability
 
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # Ctrl+C while awaiting input cancels this task
             print("\nExiting...")
         except Exception as e:
             print(f"\nError: {str(e)}")
             print(f"\n{traceback.format_exc()}")
+        finally:
+            keepalive_task.cancel()
+            await close_http_client()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_mcp_client import LLMMCPClient, TOOL_RESULTS_PREFIX
+
+
+class ReActHost:
+    """Fake LLM that requests ``tool_turns`` tool calls, then answers"""
+
+    def __init__(self, tool_turns: int):
+        self.tool_turns = tool_turns
+        self.calls = 0
+        self.seen_sizes = []
+
+    async def stream(self, messages, model_name):
+        self.seen_sizes.append(sum(len(str(m["content"])) for m in messages))
+        self.calls += 1
+        if self.calls > self.tool_turns:
+            yield "All done."
+            return
+        yield f"Reading file {self.calls}.\n"
+        yield ("<mcp_tool_call><tool_name>read_file</tool_name>"
+               f'<arguments>{{"file_path": "f{self.calls}.txt"}}</arguments>'
+               "</mcp_tool_call>")
+
+
+class HistoryPruningTest(unittest.IsolatedAsyncioTestCase):
+
+    async def run_turn(self, client, message):
+        return [chunk async for chunk in client.interactive_stream_chat(message)]
+
+    def make_client(self, tool_turns: int) -> LLMMCPClient:
+        client = LLMMCPClient(openai_api_key="test",
+                              model_name="test",
+                              mcp_client_url="http://mcp.invalid")
+        client.initialized = True
+        client.messages = [{"role": "system", "content": "system"}]
+        client.llm_host = ReActHost(tool_turns)
+
+        async def post_tool(tool_name, tool_input):
+            return {"type": "text", "text": "x" * 5000}
+
+        client._post_tool = post_tool
+        return client
+
+    def tool_result_blocks(self, client) -> int:
+        return sum(
+            str(message["content"]).count(TOOL_RESULTS_PREFIX)
+            for message in client.messages)
+
+    async def test_deep_react_loop_is_bounded_within_one_turn(self):
+        client = self.make_client(tool_turns=14)
+        await self.run_turn(client, "read everything")
+
+        # The whole loop lives in one assistant message
+        self.assertEqual([m["role"] for m in client.messages],
+                         ["system", "user", "assistant"])
+        self.assertEqual(self.tool_result_blocks(client),
+                         client.history_keep_tool_results)
+        content = client.messages[-1]["content"]
+        self.assertIn("[tool call 1: read_file -> pruned]", content)
+        self.assertIn("All done.", content)
+        # Prompt size stops growing once old results are stubbed
+        sizes = client.llm_host.seen_sizes
+        self.assertLess(sizes[-1], sizes[client.history_keep_tool_results + 1] + 2000)
+
+    async def test_recent_results_are_kept(self):
+        client = self.make_client(tool_turns=3)
+        await self.run_turn(client, "read a few")
+        self.assertEqual(self.tool_result_blocks(client), 3)
+        self.assertNotIn("-> pruned]", client.messages[-1]["content"])
+
+
+if __name__ == "__main__":
+    unittest.main()
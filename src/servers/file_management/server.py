@@ -1,7 +1,13 @@
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import List
+from collections import OrderedDict
+import asyncio
 from pathlib import Path
 import os
+import stat
+import sys
 import json
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
@@ -19,23 +25,65 @@ class FileUpdateRequest(BaseModel):
     content: str
 
 
-app = FastAPI()
-cors = CORSMiddleware(
-    app=app,
+app = FastAPI(default_response_class=ORJSONResponse)
+app.add_middleware(
+    CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# tool name -> (parameters model, tool function)
 tool_functions = {
-    "read_file": read_file,
-    "show_folder_tree": show_folder_tree,
-    "update_file": update_file,
-    "create_file": create_file
+    "read_file": (ReadFileRequest, read_file),
+    "show_folder_tree": (ShowFolderTreeRequest, show_folder_tree),
+    "update_file": (UpdateFileRequest, update_file),
+    "create_file": (UpdateFileRequest, create_file)
 }
 
 
+# Read-only tools whose results are reused while the target path is unchanged,
+# mapped to (path parameter, result for a missing target)
+CACHEABLE_TOOLS = {
+    "read_file": ("file_path", file_not_found_result),
+    "show_folder_tree": ("path", directory_not_found_result),
+}
+# Tools that modify files; running one drops every cached result
+MUTATING_TOOLS = frozenset({"update_file", "create_file"})
+RESULT_CACHE_MAXSIZE = 256
+
+result_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+cache_generation = 0
+
+
+def result_cache_key(tool_name: str, parameters: dict):
+    """Key a read-only call on its parameters and the target's mtime and size.
+
+    Returns None when the call is not cacheable, the target cannot be stat'ed
+    or it is at least LARGE_FILE_THRESHOLD bytes (batched reads of large files
+    reach run_tool, and the cache has no byte limit).
+    Raises FileNotFoundError when the target does not exist.
+    """
+    if tool_name not in CACHEABLE_TOOLS:
+        return None
+    path_param, _ = CACHEABLE_TOOLS[tool_name]
+    try:
+        full_path = safe_path(parameters.get(path_param, ""))
+        if full_path is None:
+            return None
+        file_stat = os.stat(full_path)
+        params_key = frozenset(parameters.items())
+    except FileNotFoundError:
+        raise
+    except (OSError, TypeError):
+        return None
+    if file_stat.st_size >= LARGE_FILE_THRESHOLD:
+        return None
+    return (tool_name, params_key, file_stat.st_mtime_ns, file_stat.st_size,
+            cache_generation)
+
+
 @app.get("/list/tools")
 async def list_tools():
     return tools_list
@@ -46,21 +94,100 @@ class ExecuteToolRequest(BaseModel):
     parameters: dict
 
 
-@app.post("/execute/tool")
-async def execute_tool(request: ExecuteToolRequest):
-    tool_name = request.tool_name
-    parameters = request.parameters
+# read_file results at least this large are streamed instead of built in memory
+LARGE_FILE_THRESHOLD = 1 << 20
+
+
+def large_file_response(parameters: dict):
+    """Return a streamed read_file response for large regular files, else None"""
+    file_path = parameters.get("file_path")
+    if not isinstance(file_path, str) or parameters.keys() != {"file_path"}:
+        return None
+    full_path = safe_path(file_path)
+    if full_path is None:
+        return None
+    try:
+        file_stat = os.stat(full_path)
+    except OSError:
+        return None
+    if (not stat.S_ISREG(file_stat.st_mode)
+            or file_stat.st_size < LARGE_FILE_THRESHOLD):
+        return None
+    # Open before responding so a file removed or made unreadable since the
+    # stat goes through the normal read_file error path instead of
+    # truncating a 200 body
+    try:
+        file = open(full_path, "rb")
+    except OSError:
+        return None
+    return StreamingResponse(iter_file_text_json(file),
+                             media_type="application/json")
+
+
+async def run_tool(tool_name: str, parameters: dict):
+    global cache_generation
     if tool_name not in tool_functions:
         raise HTTPException(status_code=400, detail="Tool not found")
+    model_cls, tool_function = tool_functions[tool_name]
+    try:
+        parameters = model_cls.model_validate(parameters).__dict__
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        key = result_cache_key(tool_name, parameters)
+    except FileNotFoundError as e:
+        # Answer from the stat we just did; never cached, since the file may
+        # be created at any moment (e.g. by the version control server)
+        _, not_found_result = CACHEABLE_TOOLS[tool_name]
+        return not_found_result(e.filename)
+    if key is not None and key in result_cache:
+        result_cache.move_to_end(key)
+        return result_cache[key]
     try:
-        result = await tool_functions[tool_name](**parameters)
+        result = await tool_function(**parameters)
     except Exception as e:
         print(f"Error executing tool {tool_name}: {e}")
         print(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
+    if tool_name in MUTATING_TOOLS:
+        cache_generation += 1
+        result_cache.clear()
+    elif key is not None:
+        result_cache[key] = result
+        if len(result_cache) > RESULT_CACHE_MAXSIZE:
+            result_cache.popitem(last=False)
     return result
 
 
+@app.post("/execute/tool")
+async def execute_tool(request: ExecuteToolRequest):
+    if request.tool_name == "read_file":
+        response = large_file_response(request.parameters)
+        if response is not None:
+            return response
+    return ORJSONResponse(await run_tool(request.tool_name,
+                                         request.parameters))
+
+
+class ExecuteToolBatchRequest(BaseModel):
+    calls: List[ExecuteToolRequest]
+
+
+@app.post("/execute/tool/batch")
+async def execute_tool_batch(request: ExecuteToolBatchRequest):
+
+    async def run(call: ExecuteToolRequest):
+        try:
+            return {
+                "status_code": 200,
+                "result": await run_tool(call.tool_name, call.parameters)
+            }
+        except HTTPException as e:
+            return {"status_code": e.status_code, "detail": e.detail}
+
+    return await asyncio.gather(*[run(call) for call in request.calls])
+
+
 if __name__ == "__main__":
     import uvicorn
     from dotenv import load_dotenv
@@ -69,4 +196,11 @@ if __name__ == "__main__":
 
     PORT = int(os.getenv("PORT"))
 
-    uvicorn.run("server:app", host="0.0.0.0", port=PORT)
+    uvicorn.run("server:app",
+                host="0.0.0.0",
+                port=PORT,
+                loop="uvloop" if sys.platform != "win32" else "auto",
+                http="httptools",
+                # A single worker keeps the in-process result cache coherent
+                workers=1,
+                access_log=False)
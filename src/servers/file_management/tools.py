@@ -1,6 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
 from pydantic import BaseModel
-import aiofiles
+import asyncio
+import codecs
+import orjson
+import os
 import traceback
 import logging
 
@@ -11,6 +16,124 @@ logger = logging.getLogger(__name__)
 
 BASE_DIR = Path("/data")
 BASE_DIR.mkdir(exist_ok=True)
+_BASE_RESOLVED = os.path.realpath(BASE_DIR)
+
+
+def safe_path(relative_path: str) -> Optional[str]:
+    """Resolve a tool path under BASE_DIR, or None if it escapes it.
+
+    Symlinks and ".." are resolved first, so neither can reach outside.
+    Paths the OS cannot represent (e.g. with an embedded NUL) also give None.
+    """
+    try:
+        path = os.path.realpath(os.path.join(_BASE_RESOLVED, relative_path))
+    except ValueError:
+        return None
+    if path == _BASE_RESOLVED or path.startswith(_BASE_RESOLVED + os.sep):
+        return path
+    return None
+
+
+def _outside_base_error(relative_path: str):
+    error_msg = f"Path is outside {BASE_DIR}: {relative_path}"
+    logger.warning(error_msg)
+    return {"type": "text", "text": error_msg}
+
+
+# File I/O gets its own bounded pool so a burst of parallel reads neither
+# spawns a thread per call nor starves other users of the default executor
+FILE_IO_WORKERS = int(os.getenv("FILE_IO_WORKERS", "16"))
+_io_executor = ThreadPoolExecutor(max_workers=FILE_IO_WORKERS,
+                                  thread_name_prefix="file-io")
+
+
+async def _run_io(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(
+        _io_executor, func, *args)
+
+
+# Whole files are written at once, so a large buffer means fewer syscalls
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def file_not_found_result(full_path: str):
+    error_msg = f"File not found or is not a regular file: {full_path}"
+    logger.warning(error_msg)
+    return {"type": "text", "text": error_msg}
+
+
+def directory_not_found_result(target_path: str):
+    error_msg = f"Directory not found: {target_path}"
+    logger.warning(error_msg)
+    return {"type": "text", "text": error_msg}
+
+
+# Parent directories create_file has already made, so repeated creates in
+# the same folder skip makedirs. A directory removed behind our back shows
+# up as FileNotFoundError on open and is dropped from the set.
+_CREATED_DIRS_MAXSIZE = 4096
+_created_dirs = set()
+
+
+def _ensure_dir(path: str):
+    if path in _created_dirs:
+        return
+    os.makedirs(path, exist_ok=True)
+    if len(_created_dirs) >= _CREATED_DIRS_MAXSIZE:
+        _created_dirs.clear()
+    _created_dirs.add(path)
+
+
+def _sync_read(path: str) -> str:
+    # Open, read and close in one thread-pool hop. An unbuffered readall()
+    # sizes its buffer from fstat and reads the file in one go.
+    with open(path, "rb", buffering=0) as file:
+        return file.read().decode("utf-8")
+
+
+def _sync_create(path: str, content: str):
+    # "x" creates atomically and raises FileExistsError if the path is taken
+    with open(path, "x", encoding="utf-8",
+              buffering=WRITE_BUFFER_SIZE) as file:
+        file.write(content)
+
+
+def _sync_overwrite(path: str, content: str):
+    # "r+" fails on a missing file instead of creating it
+    with open(path, "r+", encoding="utf-8",
+              buffering=WRITE_BUFFER_SIZE) as file:
+        file.write(content)
+        file.truncate()
+
+
+def _sync_list_dir(path: str):
+    # DirEntry.is_dir() uses the d_type from readdir, so only symlinks need
+    # an extra stat
+    with os.scandir(path) as entries:
+        return [(entry.name, entry.is_dir()) for entry in entries]
+
+
+def iter_file_text_json(file, chunk_size: int = 1 << 16):
+    """Yield the read_file result for an open binary file as JSON bytes.
+
+    Produces the same {"type": "text", "text": ...} object as read_file
+    without holding the whole file as a str, and closes the file when done.
+    The caller opens it, so open errors are reported before the body starts.
+    Invalid UTF-8 is replaced, since an error can no longer be reported once
+    the body has started.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with file:
+        yield b'{"type":"text","text":"'
+        while chunk := file.read(chunk_size):
+            text = decoder.decode(chunk)
+            if text:
+                # Strip the quotes orjson adds around the escaped string
+                yield orjson.dumps(text)[1:-1]
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield orjson.dumps(text)[1:-1]
+    yield b'"}'
 
 
 class ReadFileRequest(BaseModel):
@@ -18,18 +141,16 @@ class ReadFileRequest(BaseModel):
 
 
 async def read_file(file_path: str):
-    full_path = BASE_DIR / file_path
+    full_path = safe_path(file_path)
+    if full_path is None:
+        return _outside_base_error(file_path)
     try:
-        if not full_path.is_file():
-            # Specific error for file not found
-            error_msg = f"File not found or is not a regular file: {full_path}"
-            logger.warning(error_msg)
-            return {"type": "text", "text": error_msg}
-
-        async with aiofiles.open(full_path, mode='r') as file:
-            content = await file.read()
+        content = await _run_io(_sync_read, full_path)
         # Return standardized format for success
         return {"type": "text", "text": content}
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        # Specific error for file not found
+        return file_not_found_result(full_path)
     except Exception as e:
         # General error handling
         error_msg = f"Error reading file {file_path}: {str(e)}\nTraceback:\n{traceback.format_exc()}"
@@ -42,19 +163,21 @@ class ShowFolderTreeRequest(BaseModel):
 
 
 async def show_folder_tree(path: str = ""):
-    target_path = BASE_DIR / path
+    target_path = safe_path(path)
+    if target_path is None:
+        return _outside_base_error(path)
     try:
-        if not target_path.is_dir():
+        try:
+            entries = await _run_io(_sync_list_dir, target_path)
+        except (FileNotFoundError, NotADirectoryError):
             # Specific error for directory not found
-            error_msg = f"Directory not found: {target_path}"
-            logger.warning(error_msg)
-            return {"type": "text", "text": error_msg}
+            return directory_not_found_result(target_path)
 
         tree_str = f"Contents of '{target_path}':\n"
-        items = []
-        for child in target_path.iterdir():
-            item_type = "[D]" if child.is_dir() else "[F]"
-            items.append(f"  {item_type} {child.name}")
+        items = [
+            f"  {'[D]' if is_dir else '[F]'} {name}"
+            for name, is_dir in entries
+        ]
 
         if not items:
             tree_str += "  (empty)"
@@ -75,24 +198,32 @@ class UpdateFileRequest(BaseModel):
 
 
 async def create_file(file_path: str, content: str):
-    full_path = BASE_DIR / file_path
+    full_path = safe_path(file_path)
+    if full_path is None:
+        return _outside_base_error(file_path)
     try:
         # Ensure parent directory exists
+        parent = os.path.dirname(full_path)
         try:
-            full_path.parent.mkdir(parents=True, exist_ok=True)
-        except Exception as dir_e:
-            error_msg = f"Failed to create parent directory for {file_path}: {dir_e}\nTraceback:\n{traceback.format_exc()}"
+            _ensure_dir(parent)
+        except OSError as dir_e:
+            error_msg = f"Failed to create parent directory for {file_path}: {dir_e}"
             logger.error(error_msg)
             return {"type": "text", "text": error_msg}
 
-        if full_path.exists():
+        try:
+            try:
+                await _run_io(_sync_create, full_path, content)
+            except FileNotFoundError:
+                # The cached parent was removed since; recreate it once
+                _created_dirs.discard(parent)
+                _ensure_dir(parent)
+                await _run_io(_sync_create, full_path, content)
+        except FileExistsError:
             # Specific error for file exists
             error_msg = f"File already exists: {full_path}"
             logger.warning(error_msg)
             return {"type": "text", "text": error_msg}
-
-        async with aiofiles.open(full_path, mode='w') as file:
-            await file.write(content)
         # Return standardized format for success
         return {
             "type": "text",
@@ -106,21 +237,19 @@ async def create_file(file_path: str, content: str):
 
 
 async def update_file(file_path: str, content: str):
-    full_path = BASE_DIR / file_path
+    full_path = safe_path(file_path)
+    if full_path is None:
+        return _outside_base_error(file_path)
     try:
-        if not full_path.is_file():
-            # Specific error for file not found
-            error_msg = f"File not found or is not a regular file: {full_path}"
-            logger.warning(error_msg)
-            return {"type": "text", "text": error_msg}
-
-        async with aiofiles.open(full_path, mode='w') as file:
-            await file.write(content)
+        await _run_io(_sync_overwrite, full_path, content)
         # Return standardized format for success
         return {
             "type": "text",
             "text": f"File '{str(full_path)}' updated successfully."
         }
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        # Specific error for file not found
+        return file_not_found_result(full_path)
     except Exception as e:
         # General error handling
         error_msg = f"Error updating file {file_path}: {str(e)}\nTraceback:\n{traceback.format_exc()}"
@@ -128,6 +257,9 @@ async def update_file(file_path: str, content: str):
         return {"type": "text", "text": error_msg}
 
 
+# update_file and create_file take the same arguments; generate it once
+_FILE_CONTENT_SCHEMA = UpdateFileRequest.model_json_schema()
+
 tools_list = [{
     "name": "read_file",
     "description": "Read the content of a specific file.",
@@ -141,9 +273,9 @@ tools_list = [{
     "name": "update_file",
     "description":
     "Update the content of an existing file. Overwrites the file.",
-    "parameters": UpdateFileRequest.model_json_schema()
+    "parameters": _FILE_CONTENT_SCHEMA
 }, {
     "name": "create_file",
     "description": "Create a new file with the specified content.",
-    "parameters": UpdateFileRequest.model_json_schema()
+    "parameters": _FILE_CONTENT_SCHEMA
 }]
@@ -1,23 +1,23 @@
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from tools import *
 from fastapi.middleware.cors import CORSMiddleware
-from tools import *
 import traceback
 
 app = FastAPI()
-cors = CORSMiddleware(
-    app=app,
+app.add_middleware(
+    CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# tool name -> (parameters model, tool function)
 tool_functions = {
-    "git_init": git_init,
-    "git_commit": git_commit,
-    "run_command": run_command
+    "git_init": (GitInitRequest, git_init),
+    "git_commit": (GitCommitRequest, git_commit),
+    "run_command": (CommandRequest, run_command)
 }
 
 
@@ -37,8 +37,13 @@ async def execute_tool(request: ExecuteToolRequest):
     parameters = request.parameters
     if tool_name not in tool_functions:
         raise HTTPException(status_code=400, detail="Tool not found")
+    model_cls, tool_function = tool_functions[tool_name]
+    try:
+        arguments = model_cls.model_validate(parameters)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     try:
-        result = await tool_functions[tool_name](**parameters)
+        result = await tool_function(**arguments.__dict__)
     except Exception as e:
         print(f"Error executing tool {tool_name}: {e}")
         print(f"Traceback: {traceback.format_exc()}")
@@ -48,6 +53,7 @@ async def execute_tool(request: ExecuteToolRequest):
     return result
 
 
+
 if __name__ == "__main__":
     import uvicorn
     from dotenv import load_dotenv
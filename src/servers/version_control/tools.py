@@ -1,3 +1,4 @@
+import asyncio
 import os
 import subprocess
 from pathlib import Path
@@ -5,6 +6,7 @@ from pydantic import BaseModel, Field
 import traceback
 import logging
 import re
+import shlex
 
 # --- Setup basic logging ---
 logging.basicConfig(level=logging.INFO)
@@ -13,10 +15,123 @@ logger = logging.getLogger(__name__)
 
 REPO_DIR = "/repo"
 
+_DUBIOUS_OWNERSHIP_RE = re.compile(r"safe\.directory (.*?)\n")
+# Substrings (lowercased) git prints when a commit has nothing to record
+_NOTHING_TO_COMMIT_MARKERS = (
+    "nothing to commit",
+    "no changes added to commit",
+    "nothing added to commit",
+)
+
 if not os.path.exists(REPO_DIR):
     os.makedirs(REPO_DIR)
 
 
+def _configure_safe_directory() -> bool:
+    """Mark REPO_DIR as a git safe.directory once per process"""
+    try:
+        result = subprocess.run(
+            ["git", "config", "--global", "--add", "safe.directory", REPO_DIR],
+            check=False,
+            capture_output=True,
+            text=True)
+    except Exception as safe_dir_exc:
+        logger.warning("Could not set safe.directory for %s: %s", REPO_DIR,
+                       safe_dir_exc)
+        return False
+    return result.returncode == 0
+
+
+_SAFE_DIR_CONFIGURED = _configure_safe_directory()
+
+
+# Per-stream cap on captured command output; anything past it is discarded
+MAX_CAPTURE_BYTES = 1 << 20
+READ_CHUNK_SIZE = 64 * 1024
+TRUNCATED_MARKER = "\n... [output truncated]"
+
+
+async def _read_capped(stream: asyncio.StreamReader, cap: int) -> str:
+    """Read ``stream`` to EOF, keeping at most ``cap`` bytes.
+
+    The rest is still drained so the child never blocks on a full pipe.
+    """
+    buf = bytearray()
+    truncated = False
+    while chunk := await stream.read(READ_CHUNK_SIZE):
+        room = cap - len(buf)
+        if room > 0:
+            buf.extend(chunk[:room])
+        truncated = truncated or len(chunk) > room
+    text = buf.decode(errors="replace")
+    return text + TRUNCATED_MARKER if truncated else text
+
+
+async def _run(args,
+               shell: bool = False,
+               check: bool = True,
+               cwd: str = None) -> subprocess.CompletedProcess:
+    """Async counterpart of subprocess.run(..., capture_output=True, text=True).
+
+    ``args`` is a command string when ``shell`` is True, else an argument list.
+    Each of stdout/stderr is capped at MAX_CAPTURE_BYTES.
+    Raises CalledProcessError on a non-zero exit when ``check`` is True.
+    """
+    if shell:
+        process = await asyncio.create_subprocess_shell(
+            args,
+            cwd=cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE)
+    else:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            cwd=cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE)
+    try:
+        stdout, stderr = await asyncio.gather(
+            _read_capped(process.stdout, MAX_CAPTURE_BYTES),
+            _read_capped(process.stderr, MAX_CAPTURE_BYTES))
+        await process.wait()
+    except asyncio.CancelledError:
+        # Don't leave the child running when the request goes away
+        process.kill()
+        raise
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode,
+                                            args,
+                                            output=stdout,
+                                            stderr=stderr)
+    return subprocess.CompletedProcess(args, process.returncode, stdout,
+                                       stderr)
+
+
+# Characters that need /bin/sh to interpret them (pipes, redirection, globs,
+# variables, env assignments, ...)
+_SHELL_CHARS = frozenset("|&;<>()$`*?[]{}~#=!\n")
+
+
+def _launch_detached(command: str) -> subprocess.Popen:
+    """Start a fire-and-forget command, skipping the shell when not needed"""
+    options = dict(cwd=REPO_DIR,
+                   stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL,
+                   start_new_session=True)
+    if not _SHELL_CHARS.intersection(command):
+        try:
+            args = shlex.split(command)
+        except ValueError:
+            args = None
+        if args:
+            try:
+                return subprocess.Popen(args, **options)
+            except FileNotFoundError:
+                # Shell builtins like cd or export; let the shell handle them
+                pass
+    return subprocess.Popen(command, shell=True, **options)
+
+
 class GitCommitRequest(BaseModel):
     message: str
 
@@ -40,10 +155,7 @@ class GitInitRequest(BaseModel):
 
 async def git_init(create_new_repo: bool = False):
     try:
-        result = subprocess.run(["git", "-C", REPO_DIR, "init"],
-                                capture_output=True,
-                                text=True,
-                                check=True)
+        result = await _run(["git", "-C", REPO_DIR, "init"])
         # Return standardized format for success
         output_text = result.stdout.strip() or "Git repository initialized."
         if result.stderr:
@@ -51,7 +163,7 @@ async def git_init(create_new_repo: bool = False):
         return {"type": "text", "text": output_text}
     except subprocess.CalledProcessError as e:
         # Handle specific command errors
-        error_msg = f"Git init command failed with exit code {e.returncode}.\nStderr: {e.stderr or '(no stderr)'}\nStdout: {e.stdout or '(no stdout)'}\nTraceback:\n{traceback.format_exc()}"
+        error_msg = f"Git init command failed with exit code {e.returncode}.\nStderr: {e.stderr or '(no stderr)'}\nStdout: {e.stdout or '(no stdout)'}"
         logger.error(error_msg)
         return {"type": "text", "text": error_msg}
     except Exception as e:
@@ -64,19 +176,13 @@ async def git_init(create_new_repo: bool = False):
 async def git_commit(message: str):
     try:
         # Stage changes
-        add_result = subprocess.run(["git", "-C", REPO_DIR, "add", "."],
-                                    capture_output=True,
-                                    text=True,
-                                    check=True)
+        add_result = await _run(["git", "-C", REPO_DIR, "add", "."])
         if add_result.stderr:
-            logger.warning(f"Git add stderr: {add_result.stderr.strip()}")
+            logger.warning("Git add stderr: %s", add_result.stderr.strip())
 
         # Commit changes
-        commit_result = subprocess.run(
-            ["git", "-C", REPO_DIR, "commit", "-m", message],
-            capture_output=True,
-            text=True,
-            check=True)
+        commit_result = await _run(
+            ["git", "-C", REPO_DIR, "commit", "-m", message])
 
         # Return standardized format for success
         output_text = commit_result.stdout.strip(
@@ -86,18 +192,16 @@ async def git_commit(message: str):
         return {"type": "text", "text": output_text}
 
     except subprocess.CalledProcessError as e:
-        stderr_lower = e.stderr.lower() if e.stderr else ""
-        stdout_lower = e.stdout.lower() if e.stdout else ""
+        output_lower = f"{e.stderr or ''}\n{e.stdout or ''}".lower()
         # Check for "nothing to commit" case specifically
-        if "nothing to commit" in stderr_lower or \
-           "no changes added to commit" in stdout_lower or \
-           "nothing added to commit" in stderr_lower:
+        if any(marker in output_lower
+               for marker in _NOTHING_TO_COMMIT_MARKERS):
             logger.info("Git commit attempt: No changes to commit.")
             # Return standardized format for no changes
             return {"type": "text", "text": "No changes detected to commit."}
         else:
             # Handle other command errors
-            error_msg = f"Git commit command failed with exit code {e.returncode}.\nStderr: {e.stderr or '(no stderr)'}\nStdout: {e.stdout or '(no stdout)'}\nTraceback:\n{traceback.format_exc()}"
+            error_msg = f"Git commit command failed with exit code {e.returncode}.\nStderr: {e.stderr or '(no stderr)'}\nStdout: {e.stdout or '(no stdout)'}"
             logger.error(error_msg)
             return {"type": "text", "text": error_msg}
     except Exception as e:
@@ -121,30 +225,24 @@ async def run_command(command: str,
     """
     try:
         # --- Preemptive safe.directory check ---
-        if 'git' in command and not _is_retry:  # Avoid running on retry
+        # Normally done once at import; only repeated if that failed
+        if 'git' in command and not _is_retry and not _SAFE_DIR_CONFIGURED:
             try:
-                subprocess.run(
+                await _run(
                     f"git config --global --add safe.directory '{REPO_DIR}'",
                     shell=True,
-                    check=False,
-                    capture_output=True,
-                    text=True)
+                    check=False)
             except Exception as safe_dir_exc:
                 logger.warning(
-                    f"Could not preemptively set safe.directory for {REPO_DIR}: {safe_dir_exc}"
-                )
+                    "Could not preemptively set safe.directory for %s: %s",
+                    REPO_DIR, safe_dir_exc)
 
         # --- Execute command ---
         if async_run:
             # --- Async Execution ---
-            process = subprocess.Popen(command,
-                                       shell=True,
-                                       cwd=REPO_DIR,
-                                       stdout=subprocess.DEVNULL,
-                                       stderr=subprocess.DEVNULL,
-                                       start_new_session=True)
-            logger.info(
-                f"Launched async command (PID: {process.pid}): {command}")
+            process = _launch_detached(command)
+            logger.info("Launched async command (PID: %s): %s", process.pid,
+                        command)
             return {
                 "type": "text",
                 "text":
@@ -152,13 +250,9 @@ async def run_command(command: str,
             }
         else:
             # --- Sync Execution ---
-            result = subprocess.run(
-                command,
-                shell=True,
-                cwd=REPO_DIR,
-                capture_output=True,
-                text=True,
-                check=True)  # Raises CalledProcessError on non-zero exit
+            result = await _run(
+                command, shell=True,
+                cwd=REPO_DIR)  # Raises CalledProcessError on non-zero exit
 
             # Return standardized format for sync success
             output_text = result.stdout.strip(
@@ -171,23 +265,20 @@ async def run_command(command: str,
         # --- Handle Dubious Ownership ---
         if "detected dubious ownership" in e.stderr and not _is_retry:
             logger.warning(
-                f"Detected dubious ownership for command: {command}. Attempting to fix and retry."
-            )
-            match = re.search(r"safe\.directory (.*?)\n", e.stderr)
+                "Detected dubious ownership for command: %s. Attempting to fix and retry.",
+                command)
+            match = _DUBIOUS_OWNERSHIP_RE.search(e.stderr)
             if match:
                 dubious_path = match.group(1).strip("'")
                 try:
                     # Attempt to fix
-                    fix_result = subprocess.run(
+                    fix_result = await _run(
                         f"git config --global --add safe.directory '{dubious_path}'",
                         shell=True,
-                        check=True,
-                        capture_output=True,
-                        text=True,
                         cwd=REPO_DIR)
                     logger.info(
-                        f"Added {dubious_path} to git safe.directory (Output: {fix_result.stdout}, Stderr: {fix_result.stderr}). Retrying command..."
-                    )
+                        "Added %s to git safe.directory (Output: %s, Stderr: %s). Retrying command...",
+                        dubious_path, fix_result.stdout, fix_result.stderr)
                     # Retry the command ONCE after fixing
                     return await run_command(command,
                                              async_run=async_run,
@@ -199,12 +290,12 @@ async def run_command(command: str,
                     return {"type": "text", "text": error_msg}
             else:
                 # If path cannot be parsed, return error
-                error_msg = f"Could not parse dubious path from git error for command '{command}'.\nStderr: {e.stderr}\nTraceback:\n{traceback.format_exc()}"
+                error_msg = f"Could not parse dubious path from git error for command '{command}'.\nStderr: {e.stderr}"
                 logger.error(error_msg)
                 return {"type": "text", "text": error_msg}
 
         # --- General Command Failure ---
-        error_msg = f"Command '{command}' failed with exit code {e.returncode}.\nStderr: {e.stderr or '(no stderr)'}\nStdout: {e.stdout or '(no stdout)'}\nTraceback:\n{traceback.format_exc()}"
+        error_msg = f"Command '{command}' failed with exit code {e.returncode}.\nStderr: {e.stderr or '(no stderr)'}\nStdout: {e.stdout or '(no stdout)'}"
         logger.error(error_msg)
         return {"type": "text", "text": error_msg}
 